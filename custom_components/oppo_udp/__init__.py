@@ -2,21 +2,101 @@
 
 import asyncio
 import logging
+import os
 
+import voluptuous as vol
+
+from homeassistant.components.remote import ATTR_COMMAND, ATTR_DELAY_SECS, DEFAULT_DELAY_SECS
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import EVENT_HOMEASSISTANT_STOP
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import config_validation as cv
 
-from .const import DOMAIN, PLATFORMS
-from .manager import OppoUdpManager
+from oppoudpsdk import OppoRemoteCode
+
+from .const import (
+    DOMAIN, 
+    PLATFORMS, 
+    SERVICE_REPLAY_CAPTURE, 
+    SERVICE_PROFILE,
+    SERVICE_BROADCAST_COMMAND,
+    DEFAULT_PROFILE_DURATION,
+    CAPTURE_BACKUP_COUNT,
+    ATTR_CONFIG_ENTRY_ID, 
+    ATTR_PATH, 
+    ATTR_SPEED,
+    ATTR_DURATION
+)
+from .artwork import OppoUdpArtworkView, get_artwork_cache
+from .manager import OppoUdpManager, async_broadcast_commands
+from .profiler import async_start_profile
 
 CONFIG_SCHEMA = cv.deprecated(DOMAIN)
 
+REPLAY_CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_PATH): cv.string,
+        vol.Optional(ATTR_SPEED, default=1.0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    })
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=DEFAULT_PROFILE_DURATION): vol.All(vol.Coerce(float), vol.Range(min=1, max=3600)),
+    })
+
+BROADCAST_COMMAND_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Required(ATTR_COMMAND): vol.All(cv.ensure_list, [vol.Coerce(OppoRemoteCode)]),
+        vol.Optional(ATTR_DELAY_SECS, default=DEFAULT_DELAY_SECS): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    })
+
 _LOGGER = logging.getLogger(__name__)
 
 async def async_setup(hass: HomeAssistant, config: dict):
+    hass.http.register_view(OppoUdpArtworkView(get_artwork_cache(hass)))
+
+    async def async_replay_capture(call: ServiceCall):
+        """Replay a session capture through the entities of a config entry, in the background."""
+        manager = _get_manager(hass, call.data[ATTR_CONFIG_ENTRY_ID])
+        path = call.data.get(ATTR_PATH, manager.capture_path)
+        own_captures = [manager.capture_path] + [f"{manager.capture_path}.{i}" for i in range(1, CAPTURE_BACKUP_COUNT + 1)]
+        if os.path.abspath(path) not in own_captures and not hass.config.is_allowed_path(path):
+            raise HomeAssistantError(f"Access to {path} is not allowed")
+        if manager.replaying:
+            raise HomeAssistantError("A capture is already being replayed for this player")
+        manager.async_start_replay(path, call.data[ATTR_SPEED])
+
+    async def async_handle_profile(call: ServiceCall):
+        """Profile the integration in the background, the report goes to the config dir."""
+        async_start_profile(hass, call.data[ATTR_DURATION])
+
+    async def async_broadcast_command(call: ServiceCall) -> ServiceResponse:
+        """Send a command or macro to several players at once (all of them by default)."""
+        entry_ids = call.data.get(ATTR_CONFIG_ENTRY_ID) or list(hass.data.get(DOMAIN, {}))
+        managers = {entry_id: _get_manager(hass, entry_id) for entry_id in entry_ids}
+        results = await async_broadcast_commands(managers, call.data[ATTR_COMMAND], call.data[ATTR_DELAY_SECS])
+        return {"results": results}
+
+    hass.services.async_register(DOMAIN, SERVICE_REPLAY_CAPTURE, async_replay_capture, schema=REPLAY_CAPTURE_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_PROFILE, async_handle_profile, schema=PROFILE_SCHEMA)
+    hass.services.async_register(
+        DOMAIN, 
+        SERVICE_BROADCAST_COMMAND, 
+        async_broadcast_command, 
+        schema=BROADCAST_COMMAND_SCHEMA, 
+        supports_response=SupportsResponse.OPTIONAL
+    )
     return True
+
+def _get_manager(hass: HomeAssistant, entry_id: str) -> OppoUdpManager:
+    """Get the manager for a config entry."""
+    manager = hass.data.get(DOMAIN, {}).get(entry_id)
+    if manager is None:
+        raise HomeAssistantError(f"No Oppo UDP-20x player is configured for entry {entry_id}")
+    return manager
     
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up the component."""
@@ -31,6 +111,7 @@ async def on_hass_stop(event):
     entry.async_on_unload(
         hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, on_hass_stop)
     )
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     async def setup_platforms():
         """Set up platforms and initiate connection."""
@@ -0,0 +1,148 @@
+"""Cacheable cover art for the Oppo UDP-20x integration."""
+
+import asyncio
+import hashlib
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from aiohttp import hdrs, web
+import musicbrainzngs
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+
+from .const import ARTWORK_CACHE_MAX_BYTES, ARTWORK_URL, DATA_ARTWORK
+
+_LOGGER = logging.getLogger(__name__)
+
+#size variants, mapped to the Cover Art Archive thumbnail sizes (None is the original)
+ARTWORK_SIZE_THUMBNAIL = "thumbnail"
+ARTWORK_SIZE_DEFAULT = "500"
+ARTWORK_SIZE_FULL = "full"
+ARTWORK_SIZES = {
+    ARTWORK_SIZE_THUMBNAIL: "250",
+    ARTWORK_SIZE_DEFAULT: "500",
+    ARTWORK_SIZE_FULL: None,
+}
+
+#cover art for a release practically never changes
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class Artwork(NamedTuple):
+    """An image along with its strong ETag"""
+    content: bytes
+    content_type: str
+    etag: str
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> "Artwork":
+        content_type = "image/png" if content[:8] == b"\x89PNG\r\n\x1a\n" else "image/jpeg"
+        return cls(content, content_type, f'"{hashlib.sha1(content).hexdigest()}"')
+
+class ArtworkCache:
+    """
+    Least recently used cache of artwork by release id and size, bounded by total bytes.
+    Only releases that a player currently references are served, so the view cannot be
+    used as an open proxy.  Requests for artwork that is being downloaded wait for that
+    download instead of starting another one.
+    """
+    def __init__(self, hass: HomeAssistant, max_bytes: int = ARTWORK_CACHE_MAX_BYTES):
+        self._hass = hass
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._entries = OrderedDict()
+        self._releases = Counter()
+        self._downloads = {}  # type: Dict[Tuple[str, str], asyncio.Task]
+
+    def allow(self, release_id: str) -> None:
+        """Allow artwork for a release to be served, until it is released again."""
+        self._releases[release_id] += 1
+
+    def release(self, release_id: str) -> None:
+        """Drop a reference to a release, its artwork goes once nothing references it."""
+        self._releases[release_id] -= 1
+        if self._releases[release_id] > 0:
+            return
+        del self._releases[release_id]
+        for key in [key for key in self._entries if key[0] == release_id]:
+            self._evict(key)
+
+    async def async_get(self, release_id: str, size: str = ARTWORK_SIZE_DEFAULT) -> Optional[Artwork]:
+        """Get the artwork for a release, downloading it if needed."""
+        if release_id not in self._releases or size not in ARTWORK_SIZES:
+            return None
+        key = (release_id, size)
+        artwork = self._entries.get(key)
+        if artwork:
+            self._entries.move_to_end(key)
+            return artwork
+
+        download = self._downloads.get(key)
+        if download is None:
+            download = self._downloads[key] = self._hass.async_create_task(self._async_download(key))
+            download.add_done_callback(lambda _: self._downloads.pop(key, None))
+        #a caller giving up (timeout, closed request) does not cancel it for the others
+        return await asyncio.shield(download)
+
+    async def _async_download(self, key) -> Optional[Artwork]:
+        release_id, size = key
+        content = await self._hass.async_add_executor_job(_get_image, release_id, ARTWORK_SIZES[size])
+        if not content:
+            return None
+        artwork = Artwork.from_bytes(content)
+        if release_id in self._releases:
+            self._store(key, artwork)
+        return artwork
+
+    def _store(self, key, artwork: Artwork) -> None:
+        """Keep the artwork unless it alone is over the budget (large originals)."""
+        if len(artwork.content) > self._max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = artwork
+        self._size += len(artwork.content)
+        while self._size > self._max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key) -> None:
+        self._size -= len(self._entries.pop(key).content)
+
+def _get_image(release_id: str, size: Optional[str]) -> Optional[bytes]:
+    try:
+        return musicbrainzngs.get_image_front(release_id, size)
+    except Exception as err:
+        _LOGGER.info(f"Could not get image for release {release_id}, error={err}")
+        return None
+
+def get_artwork_cache(hass: HomeAssistant) -> ArtworkCache:
+    """Get the shared artwork cache."""
+    cache = hass.data.get(DATA_ARTWORK)
+    if cache is None:
+        cache = hass.data[DATA_ARTWORK] = ArtworkCache(hass)
+    return cache
+
+def artwork_url(release_id: str, size: str = ARTWORK_SIZE_DEFAULT) -> str:
+    """The local url of the artwork for a release."""
+    return ARTWORK_URL.format(release_id=release_id, size=size)
+
+class OppoUdpArtworkView(HomeAssistantView):
+    """Serve artwork with strong ETags and long cache lifetimes."""
+
+    url = ARTWORK_URL
+    name = "api:oppo_udp:artwork"
+    requires_auth = False
+
+    def __init__(self, cache: ArtworkCache):
+        self._cache = cache
+
+    async def get(self, request: web.Request, release_id: str, size: str) -> web.Response:
+        artwork = await self._cache.async_get(release_id, size)
+        if artwork is None:
+            return web.Response(status=404)
+
+        headers = {hdrs.ETAG: artwork.etag, hdrs.CACHE_CONTROL: CACHE_CONTROL}
+        if artwork.etag in request.headers.get(hdrs.IF_NONE_MATCH, ""):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=artwork.content, content_type=artwork.content_type, headers=headers)
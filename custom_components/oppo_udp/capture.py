@@ -0,0 +1,173 @@
+"""Capture and replay of Oppo SDK event streams."""
+
+import asyncio
+import json
+import logging
+import os
+from typing import List, Optional
+
+from homeassistant.core import HomeAssistant, callback
+
+from oppoudpsdk import OppoClient
+from oppoudpsdk import (
+    EVENT_COMMAND_RESPONSE,
+    EVENT_COMMAND_SENT,
+    EVENT_CONNECTED,
+    EVENT_DISCONNECTED,
+    EVENT_MESSAGE_RECEIVED
+)
+
+from .const import CAPTURE_FLUSH_INTERVAL, CAPTURE_MAX_BYTES, CAPTURE_BACKUP_COUNT
+from .snapshot import OppoStateSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+#record kinds, each line of a capture is [seconds since start, kind, payload]
+KIND_CONNECTED = "c"
+KIND_DISCONNECTED = "x"
+KIND_RECEIVED = "rx"
+KIND_SENT = "tx"
+KIND_ROUND_TRIP = "rt"
+KIND_DELTA = "d"
+
+class SessionRecorder:
+    """
+    Records the raw SDK event stream, device state deltas and command round-trips to a
+    JSON lines file.  Records are buffered in memory and appended from the executor
+    every few seconds, rotating the file when it gets too large.
+    """
+    def __init__(self, hass: HomeAssistant, path: str, max_bytes: int = CAPTURE_MAX_BYTES, backup_count: int = CAPTURE_BACKUP_COUNT):
+        self._hass = hass
+        self._path = path
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._buffer = []  # type: List[str]
+        self._started_at = hass.loop.time()
+        self._sent_at = None
+        self._last_state = None
+        self._flush_handle = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def attach(self, client: OppoClient) -> None:
+        """Record the events of a client."""
+        client.add_event_handler(EVENT_MESSAGE_RECEIVED, self._on_message_received)
+        client.add_event_handler(EVENT_COMMAND_SENT, self._on_command_sent)
+        client.add_event_handler(EVENT_COMMAND_RESPONSE, self._on_command_response)
+        client.add_event_handler(EVENT_CONNECTED, self._on_connected)
+        client.add_event_handler(EVENT_DISCONNECTED, self._on_disconnected)
+
+    @callback
+    def record_state(self, snapshot: Optional[OppoStateSnapshot]) -> None:
+        """Record the fields that changed since the previous snapshot."""
+        if snapshot is None:
+            return
+        state = snapshot.as_dict()
+        previous = self._last_state or {}
+        delta = {k: v for k, v in state.items() if previous.get(k) != v}
+        self._last_state = state
+        if delta:
+            self._record(KIND_DELTA, delta)
+
+    async def async_close(self) -> None:
+        """Flush anything that is still buffered."""
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        await self._async_flush()
+
+    async def _on_message_received(self, response):
+        self._record(KIND_RECEIVED, response.raw_value.decode(errors="replace"))
+
+    async def _on_command_sent(self, command):
+        self._sent_at = self._hass.loop.time()
+        self._record(KIND_SENT, command.encode().decode().rstrip("\r"))
+
+    async def _on_command_response(self, response):
+        if self._sent_at is not None:
+            self._record(KIND_ROUND_TRIP, round((self._hass.loop.time() - self._sent_at) * 1000, 1))
+            self._sent_at = None
+
+    async def _on_connected(self, _):
+        self._record(KIND_CONNECTED, None)
+
+    async def _on_disconnected(self, _):
+        self._record(KIND_DISCONNECTED, None)
+
+    def _record(self, kind: str, payload) -> None:
+        offset = round(self._hass.loop.time() - self._started_at, 3)
+        self._buffer.append(json.dumps([offset, kind, payload], separators=(",", ":")))
+        if self._flush_handle is None:
+            self._flush_handle = self._hass.loop.call_later(CAPTURE_FLUSH_INTERVAL, self._schedule_flush)
+
+    @callback
+    def _schedule_flush(self) -> None:
+        self._flush_handle = None
+        self._hass.async_create_task(self._async_flush())
+
+    async def _async_flush(self) -> None:
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        try:
+            await self._hass.async_add_executor_job(self._write, lines)
+        except OSError as err:
+            _LOGGER.warning(f"Could not write capture {self._path}: {err}")
+
+    def _write(self, lines: List[str]) -> None:
+        """Append to the capture, rotating it first if needed (executor)."""
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        if os.path.exists(self._path) and os.path.getsize(self._path) >= self._max_bytes:
+            for i in range(self._backup_count - 1, 0, -1):
+                source = f"{self._path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self._path}.{i + 1}")
+            os.replace(self._path, f"{self._path}.1")
+        with open(self._path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+class OppoReplayClient(OppoClient):
+    """A client that is fed from a capture instead of a socket, commands go nowhere."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        #normally set by the first command sent, which never happens here
+        self._current_command = None
+
+    async def async_send_command(self, command):
+        """Commands cannot be answered during a replay, the capture holds the responses."""
+
+    async def async_feed(self, message: str) -> None:
+        """Process a captured message as if it came from the device."""
+        await self._process_message(message.encode())
+
+def load_capture(path: str) -> list:
+    """Read a capture file (executor)."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def async_replay_capture(client: OppoReplayClient, records: list, speed: float = 1.0) -> int:
+    """
+    Feed the received messages of a capture through a replay client, at the given speed
+    multiple of the recorded timing (0 replays as fast as possible).  Returns the number
+    of messages replayed.
+    """
+    count = 0
+    previous = None
+    for offset, kind, payload in records:
+        if kind == KIND_CONNECTED:
+            await client.async_event(EVENT_CONNECTED, client)
+        elif kind != KIND_RECEIVED:
+            continue
+        if speed > 0 and previous is not None and offset > previous:
+            await asyncio.sleep((offset - previous) / speed)
+        else:
+            #let the event handlers catch up
+            await asyncio.sleep(0)
+        previous = offset
+        if kind == KIND_RECEIVED:
+            await client.async_feed(payload)
+            count += 1
+    return count
@@ -1,4 +1,5 @@
 """ ConfigFlow for the Oppo UDP-20x Integration """
+import asyncio
 import logging
 import ipaddress
 import re
@@ -6,11 +7,35 @@
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.const import CONF_HOST, CONF_PORT
-from oppoudpsdk import OppoClient
+from homeassistant.const import CONF_HOST, CONF_MAC, CONF_PORT
+from homeassistant.core import callback
+from homeassistant.helpers.device_registry import format_mac
+from oppoudpsdk import OppoClient, OppoQueryCommand, EVENT_READY
+from oppoudpsdk.codes import OppoQueryCode
 
-from .const import DEFAULT_PORT, DOMAIN
-from .exceptions import HaAlreadyConfigured, HaCannotConnect, HaInvalidHost
+from .const import (
+    DEFAULT_PORT, 
+    DOMAIN,
+    CONNECT_TIMEOUT,
+    CONF_ADAPTIVE_VERBOSE,
+    DEFAULT_ADAPTIVE_VERBOSE,
+    CONF_BACKGROUND_CONNECTIONS,
+    DEFAULT_BACKGROUND_CONNECTIONS,
+    CONF_DURATION_FORMAT,
+    DEFAULT_DURATION_FORMAT,
+    DURATION_FORMAT_STRING,
+    DURATION_FORMAT_SECONDS,
+    CONF_ATTRIBUTE_TIER,
+    DEFAULT_ATTRIBUTE_TIER,
+    ATTRIBUTE_TIER_ESSENTIAL,
+    ATTRIBUTE_TIER_EXTENDED,
+    ATTRIBUTE_TIER_DEBUG,
+    CONF_CAPTURE,
+    DEFAULT_CAPTURE
+)
+from .discovery import async_discover_players, async_get_local_networks
+from .exceptions import HaAlreadyConfigured, HaCannotConnect, HaInvalidHost, HaInvalidMac
+from .manager import async_store_pending_client
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,6 +43,7 @@
     {
         vol.Required(CONF_HOST): str,
         vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
+        vol.Optional(CONF_MAC): str,
     })
 
 def host_valid(host: str) -> bool:
@@ -32,14 +58,74 @@ def host_valid(host: str) -> bool:
     allowed = re.compile(r"(?!-)[A-Z\d\-\_]{1,63}(?<!-)$", re.IGNORECASE)
     return all(allowed.match(x) for x in host.split("."))    
 
+MAC_PATTERN = re.compile(r"^([0-9a-f]{2}:){5}[0-9a-f]{2}$")
+
+def normalize_mac(mac: str) -> str:
+    """Return the MAC address in the aa:bb:cc:dd:ee:ff form, raises HaInvalidMac if malformed."""
+    mac = format_mac(mac.strip())
+    if not MAC_PATTERN.match(mac):
+        raise HaInvalidMac
+    return mac
+
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Oppo UDP-20x."""
 
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_PUSH
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
+    def __init__(self):
+        self._discovered = {}
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
+        return self.async_show_menu(step_id="user", menu_options=["discover", "manual"])
+
+    async def async_step_discover(self, user_input=None):
+        """Scan the local networks for players and let the user pick one."""
+        errors = {}
+
+        if user_input is not None:
+            host: str = user_input[CONF_HOST]
+            try:
+                data = {CONF_HOST: host, CONF_PORT: DEFAULT_PORT}
+                if user_input.get(CONF_MAC):
+                    data[CONF_MAC] = normalize_mac(user_input[CONF_MAC])
+                await self.test_connection(host, DEFAULT_PORT)
+                return self.async_create_entry(title=host, data=data)
+            except HaCannotConnect:
+                errors[CONF_HOST] = "cannot_connect"
+            except HaInvalidMac:
+                errors[CONF_MAC] = "invalid_mac"
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Unexpected exception")
+                errors["base"] = "unknown"
+        else:
+            networks = await async_get_local_networks(self.hass)
+            self._discovered = await async_discover_players(
+                networks, DEFAULT_PORT, exclude=self.configured_hosts()
+            )
+            if not self._discovered:
+                return self.async_show_form(
+                    step_id="manual", data_schema=DATA_SCHEMA, errors={"base": "no_devices_found"}
+                )
+
+        schema = vol.Schema(
+            {
+                vol.Required(CONF_HOST): vol.In(
+                    {host: f"{host} ({version})" for host, version in self._discovered.items()}
+                ),
+                vol.Optional(CONF_MAC): str,
+            })
+        return self.async_show_form(step_id="discover", data_schema=schema, errors=errors)
+
+    async def async_step_manual(self, user_input=None):
+        """Handle manually entering a host."""
         errors = {}
         
         if user_input is not None:
@@ -52,12 +138,18 @@ async def async_step_user(self, user_input=None):
 
                 if self.host_already_configured(host):
                     raise HaAlreadyConfigured
+
+                data = {CONF_HOST: host, CONF_PORT: port}
+                if user_input.get(CONF_MAC):
+                    data[CONF_MAC] = normalize_mac(user_input[CONF_MAC])
                 
                 await self.test_connection(host, port)
 
-                return self.async_create_entry(title=host, data=user_input)
+                return self.async_create_entry(title=host, data=data)
             except HaCannotConnect:
                 errors[CONF_HOST] = "cannot_connect"
+            except HaInvalidMac:
+                errors[CONF_MAC] = "invalid_mac"
             except HaAlreadyConfigured:
                 errors[CONF_HOST] = "already_configured"
             except HaInvalidHost:
@@ -68,24 +160,87 @@ async def async_step_user(self, user_input=None):
 
         # If there is no user input or there were errors, show the form again, including any errors that were found with the input.
         return self.async_show_form(
-            step_id="user", data_schema=DATA_SCHEMA, errors=errors
+            step_id="manual", data_schema=DATA_SCHEMA, errors=errors
         )
 
-    def host_already_configured(self, host: str) -> bool:
-        """See if we already have a dunehd entry matching user input configured."""
-        existing_hosts = {
+    def configured_hosts(self) -> set:
+        """The hosts of the existing entries."""
+        return {
             entry.data[CONF_HOST] for entry in self._async_current_entries()
         }
-        return host in existing_hosts        
+
+    def host_already_configured(self, host: str) -> bool:
+        """See if we already have a dunehd entry matching user input configured."""
+        return host in self.configured_hosts()
 
     async def test_connection(self, host: str, port: int):
-        """Validate the user input allows us to connect."""
+        """
+        Validate the user input allows us to connect.  The validated session (along 
+        with the power status and firmware version) is handed over to the manager.
+        """
+        client = OppoClient(host, port, event_loop=self.hass.loop)
+        ready = asyncio.Event()
+
+        async def _on_ready(_):
+            ready.set()
+
+        client.add_event_handler(EVENT_READY, _on_ready)
+        self.hass.loop.create_task(client.async_run_client())
 
         #connect to the client
         try:            
-            client = OppoClient(host, port)
-            result = await client.test_connection()
-            if not result:
-                raise HaCannotConnect
+            await asyncio.wait_for(ready.wait(), CONNECT_TIMEOUT)
+            await client.async_send_command(OppoQueryCommand(OppoQueryCode.QVR))
         except:
-            raise HaCannotConnect
\ No newline at end of file
+            await client.disconnect()
+            raise HaCannotConnect
+        finally:
+            client.event_handlers[EVENT_READY].remove(_on_ready)
+
+        async_store_pending_client(self.hass, host, port, client)
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the options for Oppo UDP-20x."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry):
+        self._config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        errors = {}
+
+        if user_input is not None:
+            try:
+                #an empty MAC address is kept, it turns off the one entered with the host
+                user_input[CONF_MAC] = normalize_mac(user_input[CONF_MAC]) if user_input.get(CONF_MAC) else ""
+                return self.async_create_entry(title="", data=user_input)
+            except HaInvalidMac:
+                errors[CONF_MAC] = "invalid_mac"
+
+        options = self._config_entry.options
+        mac = options.get(CONF_MAC, self._config_entry.data.get(CONF_MAC))
+        schema = vol.Schema(
+            {
+                vol.Optional(CONF_MAC, description={"suggested_value": mac}): str,
+                vol.Required(
+                    CONF_ADAPTIVE_VERBOSE, 
+                    default=options.get(CONF_ADAPTIVE_VERBOSE, DEFAULT_ADAPTIVE_VERBOSE)
+                ): bool,
+                vol.Required(
+                    CONF_BACKGROUND_CONNECTIONS, 
+                    default=options.get(CONF_BACKGROUND_CONNECTIONS, DEFAULT_BACKGROUND_CONNECTIONS)
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Required(
+                    CONF_DURATION_FORMAT, 
+                    default=options.get(CONF_DURATION_FORMAT, DEFAULT_DURATION_FORMAT)
+                ): vol.In([DURATION_FORMAT_STRING, DURATION_FORMAT_SECONDS]),
+                vol.Required(
+                    CONF_ATTRIBUTE_TIER, 
+                    default=options.get(CONF_ATTRIBUTE_TIER, DEFAULT_ATTRIBUTE_TIER)
+                ): vol.In([ATTRIBUTE_TIER_ESSENTIAL, ATTRIBUTE_TIER_EXTENDED, ATTRIBUTE_TIER_DEBUG]),
+                vol.Required(
+                    CONF_CAPTURE, 
+                    default=options.get(CONF_CAPTURE, DEFAULT_CAPTURE)
+                ): bool,
+            })
+        return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
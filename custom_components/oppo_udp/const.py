@@ -11,8 +11,79 @@
 MAX_RETRY_DELAY = 1800
 RETRY_OFFLINE_COUNT = 5
 
+WAKE_TIMEOUT = 60
+WAKE_RETRY_INTERVAL = 2
+COMMAND_TTL = 10
+COMMAND_BUFFER_SIZE = 32
+
+CONNECT_TIMEOUT = 10
+PENDING_CLIENT_TIMEOUT = 60
+DISCOVERY_TIMEOUT = 1.0
+DISCOVERY_CONCURRENCY = 64
+DISCOVERY_MAX_HOSTS_PREFIX = 24
+
+HEARTBEAT_PLAYING_INTERVAL = 10
+HEARTBEAT_IDLE_INTERVAL = 60
+HEARTBEAT_TIMEOUT = 5
+
+POSITION_DRIFT_THRESHOLD = 2
+
+CONF_ADAPTIVE_VERBOSE = "adaptive_verbose"
+DEFAULT_ADAPTIVE_VERBOSE = True
+CONF_BACKGROUND_CONNECTIONS = "background_connections"
+DEFAULT_BACKGROUND_CONNECTIONS = 0
+
+CONF_DURATION_FORMAT = "duration_format"
+DURATION_FORMAT_STRING = "string"
+DURATION_FORMAT_SECONDS = "seconds"
+DEFAULT_DURATION_FORMAT = DURATION_FORMAT_STRING
+
+CONF_ATTRIBUTE_TIER = "attribute_tier"
+ATTRIBUTE_TIER_ESSENTIAL = "essential"
+ATTRIBUTE_TIER_EXTENDED = "extended"
+ATTRIBUTE_TIER_DEBUG = "debug"
+DEFAULT_ATTRIBUTE_TIER = ATTRIBUTE_TIER_EXTENDED
+
+CONF_CAPTURE = "capture"
+DEFAULT_CAPTURE = False
+CAPTURE_FLUSH_INTERVAL = 5
+CAPTURE_MAX_BYTES = 5 * 1024 * 1024
+CAPTURE_BACKUP_COUNT = 3
+
+ATTR_POSITION = "position"
+ATTR_POSITION_UPDATED_AT = "position_updated_at"
+ATTR_VERBOSE_MODE = "verbose_mode"
+ATTR_WATCHED = "watched"
+ATTR_POWER_ON_DURATION = "power_on_duration"
+ATTR_RESTORED = "restored"
+
 PLATFORMS = [MEDIA_PLAYER_DOMAIN, REMOTE_DOMAIN]
 
+DATA_PENDING_CLIENTS = f"{DOMAIN}_pending_clients"
+DATA_PROFILER = f"{DOMAIN}_profiler"
+DATA_ARTWORK = f"{DOMAIN}_artwork"
+
+MUSICBRAINZ_TIMEOUT = 10
+MUSICBRAINZ_FAILURE_THRESHOLD = 3
+MUSICBRAINZ_RESET_TIMEOUT = 300
+MUSICBRAINZ_NOT_FOUND_TTL = 86400
+MUSICBRAINZ_ERROR_TTL = 300
+MUSICBRAINZ_NEGATIVE_CACHE_SIZE = 256
+
+ARTWORK_URL = "/api/oppo_udp/artwork/{release_id}/{size}"
+ARTWORK_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+SERVICE_REPLAY_CAPTURE = "replay_capture"
+SERVICE_PROFILE = "profile"
+SERVICE_BROADCAST_COMMAND = "broadcast_command"
+BROADCAST_CONCURRENCY = 8
+DEFAULT_PROFILE_DURATION = 60
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_PATH = "path"
+ATTR_SPEED = "speed"
+ATTR_DURATION = "duration"
+
 SIGNAL_CONNECTED = "oppo_udp_connected"
 SIGNAL_DISCONNECTED = "oppo_udp_disconnected"
 SIGNAL_CLIENT_CREATED = "oppo_udp_client_created"
\ No newline at end of file
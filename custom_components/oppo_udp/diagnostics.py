@@ -0,0 +1,41 @@
+"""Diagnostics support for the Oppo UDP-20x integration."""
+
+import asyncio
+import os
+from collections import Counter
+
+import oppoudpsdk
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_MAC
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .manager import OppoUdpManager
+from .musicbrainz import musicbrainz_diagnostics
+
+TO_REDACT = {CONF_MAC}
+
+#tasks running coroutines from these directories are counted
+_TASK_SOURCES = (os.path.dirname(__file__), os.path.dirname(oppoudpsdk.__file__))
+
+def _task_counts() -> dict:
+    """Live tasks of the integration and the SDK by coroutine, to spot growth across reconnects"""
+    counts = Counter()
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        code = getattr(coro, "cr_code", None)
+        if code and code.co_filename.startswith(_TASK_SOURCES):
+            counts[coro.__qualname__] += 1
+    return dict(counts)
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return diagnostics for a config entry."""
+    manager: OppoUdpManager = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "manager": manager.diagnostics(),
+        "musicbrainz": musicbrainz_diagnostics(),
+        "tasks": _task_counts(),
+    }
@@ -0,0 +1,98 @@
+"""Network discovery of Oppo UDP-20x players."""
+
+import asyncio
+import ipaddress
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from homeassistant.components import network
+from homeassistant.core import HomeAssistant
+
+from .const import DEFAULT_PORT, DISCOVERY_CONCURRENCY, DISCOVERY_MAX_HOSTS_PREFIX, DISCOVERY_TIMEOUT
+
+_LOGGER = logging.getLogger(__name__)
+
+#query the firmware version, which every UDP-20x answers regardless of power/verbose mode
+PROBE_COMMAND = b"#QVR\r"
+PROBE_MAX_LINES = 5
+
+async def async_get_local_networks(hass: HomeAssistant) -> List[ipaddress.IPv4Network]:
+    """
+    Get the IPv4 networks of the enabled adapters.  Anything larger than a /24 is
+    narrowed to the /24 around the local address to keep the scan short.
+    """
+    networks = []
+    for adapter in await network.async_get_adapters(hass):
+        if not adapter["enabled"]:
+            continue
+        for ip_info in adapter["ipv4"]:
+            address = ipaddress.IPv4Address(ip_info["address"])
+            if address.is_loopback:
+                continue
+            prefix = max(ip_info["network_prefix"], DISCOVERY_MAX_HOSTS_PREFIX)
+            net = ipaddress.IPv4Network(f"{address}/{prefix}", strict=False)
+            if net not in networks:
+                networks.append(net)
+    return networks
+
+async def async_probe_host(host: str, port: int = DEFAULT_PORT, timeout: float = DISCOVERY_TIMEOUT) -> Optional[str]:
+    """
+    Check whether a host is an Oppo UDP-20x by querying its firmware version.
+    Returns the firmware version or None if the host did not answer like an Oppo.
+    """
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        writer.write(PROBE_COMMAND)
+        await writer.drain()
+        for _ in range(PROBE_MAX_LINES):
+            line = await asyncio.wait_for(reader.readuntil(b"\r"), timeout)
+            version = _parse_probe_response(line)
+            if version is not None:
+                return version
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, UnicodeDecodeError):
+        pass
+    finally:
+        if writer:
+            writer.close()
+            try:
+                await asyncio.wait_for(writer.wait_closed(), timeout)
+            except (OSError, asyncio.TimeoutError):
+                pass
+    return None
+
+def _parse_probe_response(line: bytes) -> Optional[str]:
+    """Parse a QVR response, with or without verbose mode (i.e. '@OK x' or '@QVR OK x')"""
+    segments = line.decode().strip().split(" ")
+    if segments[0] == "@OK":
+        return " ".join(segments[1:])
+    if segments[0] == "@QVR" and len(segments) > 1 and segments[1] == "OK":
+        return " ".join(segments[2:])
+    return None
+
+async def async_discover_players(
+    networks: Iterable[ipaddress.IPv4Network],
+    port: int = DEFAULT_PORT,
+    exclude: Iterable[str] = (),
+    concurrency: int = DISCOVERY_CONCURRENCY,
+    timeout: float = DISCOVERY_TIMEOUT
+) -> Dict[str, str]:
+    """Scan the given networks concurrently, returns a map of host to firmware version."""
+    excluded = set(exclude)
+    semaphore = asyncio.Semaphore(concurrency)
+    hosts = []
+    for net in networks:
+        for address in (net.hosts() if net.num_addresses > 1 else [net.network_address]):
+            host = str(address)
+            if host not in excluded and host not in hosts:
+                hosts.append(host)
+
+    async def _probe(host: str):
+        async with semaphore:
+            return host, await async_probe_host(host, port, timeout)
+
+    _LOGGER.debug(f"Scanning {len(hosts)} hosts for Oppo players")
+    results = await asyncio.gather(*[_probe(host) for host in hosts])
+    found = {host: version for host, version in results if version is not None}
+    _LOGGER.debug(f"Found {len(found)} Oppo players: {found}")
+    return found
@@ -1,21 +1,50 @@
 """Base Entity for the Oppo UDP-20x integration."""
 
+import dataclasses
 import logging
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.restore_state import ExtraStoredData, RestoreEntity
 
 
 from oppoudpsdk import OppoDevice
 
 from .const import DOMAIN, SIGNAL_CLIENT_CREATED, SIGNAL_CONNECTED, SIGNAL_DISCONNECTED
 from .manager import OppoUdpManager
+from .musicbrainz import MusicBrainzInfo
+from .snapshot import OppoStateSnapshot
 
 _LOGGER = logging.getLogger(__name__)
 
-class OppoUdpEntity(Entity):
+class OppoUdpExtraStoredData(ExtraStoredData):
+    """The last published snapshot and MusicBrainz metadata, restored at startup"""
+    def __init__(self, snapshot: Optional[OppoStateSnapshot], musicbrainz_info: Optional[MusicBrainzInfo] = None):
+        self.snapshot = snapshot
+        self.musicbrainz_info = musicbrainz_info
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "snapshot": self.snapshot.as_stored_dict() if self.snapshot else None,
+            "musicbrainz_info": dataclasses.asdict(self.musicbrainz_info) if self.musicbrainz_info else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional["OppoUdpExtraStoredData"]:
+        snapshot = data.get("snapshot")
+        info = data.get("musicbrainz_info")
+        try:
+            if info:
+                info = MusicBrainzInfo(**info)
+                if info.track_titles:
+                    #JSON turned the track numbers into strings
+                    info.track_titles = {int(k): v for k, v in info.track_titles.items()}
+        except (TypeError, ValueError):
+            info = None
+        return cls(OppoStateSnapshot.from_stored_dict(snapshot) if snapshot else None, info)
+
+class OppoUdpEntity(RestoreEntity):
     """
     Base class for Oppo Home Assistant entities
     """
@@ -29,6 +58,21 @@ def __init__(self, host: str, name: str, identifier: str, manager: OppoUdpManage
     def device(self) -> OppoDevice:
         return self._manager.device
 
+    @property
+    def snapshot(self) -> Optional[OppoStateSnapshot]:
+        """The device state as of the most recent SDK event"""
+        return self._manager.snapshot
+
+    @property
+    def restored(self) -> bool:
+        """Indicates whether the published state was restored and is not yet confirmed"""
+        return self._manager.snapshot_restored
+
+    @property
+    def extra_restore_state_data(self) -> OppoUdpExtraStoredData:
+        """The state to restore after a restart"""
+        return OppoUdpExtraStoredData(self._manager.last_known_snapshot)
+
     @property
     def available(self) -> bool:
         return self._manager.online
@@ -62,8 +106,8 @@ def device_info(self) -> Dict:
             "manufacturer": "Oppo",
             "model": "UDP-20x"
         }
-        if self._manager.device:
-            attrs["sw_version"] = self._manager.device.firmware_version
+        if self.snapshot:
+            attrs["sw_version"] = self.snapshot.firmware_version
 
         return attrs
 
@@ -88,19 +132,33 @@ def _async_client_created(client):
             self.async_client_created(client)
             self.schedule_update_ha_state()   
 
-        async_dispatcher_connect(
-            self.hass, f"{SIGNAL_CONNECTED}_{self._identifier}", _async_connected
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, f"{SIGNAL_CONNECTED}_{self._identifier}", _async_connected
+            )
+        )
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, f"{SIGNAL_CLIENT_CREATED}_{self._identifier}", _async_client_created
+            )
         )
-        async_dispatcher_connect(
-            self.hass, f"{SIGNAL_CLIENT_CREATED}_{self._identifier}", _async_client_created
-        )        
-
         self.async_on_remove(
             async_dispatcher_connect(
                 self.hass, f"{SIGNAL_DISCONNECTED}_{self._identifier}", _async_disconnected
             )
         )
 
+        last_data = await self.async_get_last_extra_data()
+        if last_data:
+            data = OppoUdpExtraStoredData.from_dict(last_data.as_dict())
+            self.async_restore(data)
+
+    @callback
+    def async_restore(self, data: OppoUdpExtraStoredData):
+        """Publish the state stored before the restart until the device reports."""
+        if data.snapshot:
+            self._manager.restore_snapshot(data.snapshot)
+
     def async_device_connected(self, device):
         """Handle when connection is made to device."""
 
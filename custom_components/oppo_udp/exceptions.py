@@ -9,4 +9,7 @@ class HaInvalidHost(ha_exc.HomeAssistantError):
     """Error to indicate we don't have a valid host."""    
 
 class HaAlreadyConfigured(ha_exc.HomeAssistantError):
-    """Error to indicate that the host is already configured"""
\ No newline at end of file
+    """Error to indicate that the host is already configured"""
+
+class HaInvalidMac(ha_exc.HomeAssistantError):
+    """Error to indicate that the MAC address is malformed"""
@@ -3,21 +3,97 @@
 import asyncio
 import async_timeout
 import logging
-from typing import Optional
+from typing import Dict, List, NamedTuple, Optional
+
+import wakeonlan
 
 from homeassistant.const import CONF_HOST, CONF_MAC, CONF_PORT
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.components.websocket_api.const import DATA_CONNECTIONS, SIGNAL_WEBSOCKET_CONNECTED, SIGNAL_WEBSOCKET_DISCONNECTED
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
 
-from oppoudpsdk import OppoClient, OppoDevice
-from oppoudpsdk import EVENT_DEVICE_STATE_UPDATED, EVENT_CONNECTED, EVENT_DISCONNECTED
+from oppoudpsdk import OppoClient, OppoDevice, OppoQueryCommand, OppoSetVerboseModeCommand, PowerStatus, ResultCode, SetVerboseMode
+from oppoudpsdk import OppoCommand, OppoRemoteCode, OppoRemoteCommand, OppoSetCommand
+from oppoudpsdk import EVENT_DEVICE_STATE_UPDATED, EVENT_CONNECTED, EVENT_DISCONNECTED, EVENT_MESSAGE_RECEIVED, EVENT_COMMAND_SENT
+from oppoudpsdk import EVENT_DISC_ID_CHANGED, EVENT_COMMAND_RESPONSE
+from oppoudpsdk.response import OppoResponse
+from oppoudpsdk.codes import OppoQueryCode
 
 from .const import *
 from .exceptions import *
+from .capture import SessionRecorder, OppoReplayClient, async_replay_capture, load_capture
+from .snapshot import OppoStateSnapshot
 
 _LOGGER = logging.getLogger(__name__)
 
+#remote codes that change the power state
+POWER_CODES = frozenset([OppoRemoteCode.POW.value, OppoRemoteCode.PON.value, OppoRemoteCode.POF.value])
+#what a power toggle turns a pending absolute power command into
+TOGGLED_POWER_CODES = {OppoRemoteCode.PON.value: OppoRemoteCode.POF, OppoRemoteCode.POF.value: OppoRemoteCode.PON}
+
+class BufferedCommand(NamedTuple):
+    """A command waiting for the session to come up, and the time to wait after sending it"""
+    command: OppoCommand
+    expires_at: float
+    delay: float = 0
+
+def _supersedes(command: OppoCommand, buffered: OppoCommand) -> bool:
+    """Indicates whether a command makes a buffered one pointless"""
+    code, buffered_code = command.code.value, buffered.code.value
+    if code in POWER_CODES:
+        #an absolute power command makes any earlier one moot, toggles are resolved when buffering
+        return code != OppoRemoteCode.POW.value and buffered_code in POWER_CODES
+    #set commands hold a value (volume, input, repeat mode, position), the last one wins
+    return isinstance(command, OppoSetCommand) and isinstance(buffered, OppoSetCommand) and code == buffered_code
+
+@callback
+def async_store_pending_client(hass: HomeAssistant, host: str, port: int, client: OppoClient) -> None:
+    """
+    Keep a client validated by the config flow so that the manager for the new entry
+    can take over its session.  Clients that are not claimed in time are disconnected.
+    """
+    pending = hass.data.setdefault(DATA_PENDING_CLIENTS, {})
+
+    @callback
+    def _expire():
+        if pending.get((host, port), (None,))[0] is client:
+            _LOGGER.debug(f"Discarding unclaimed client for {host}:{port}")
+            pending.pop((host, port))
+            hass.async_create_task(client.disconnect())
+
+    async_pop_pending_client(hass, host, port, discard=True)
+    pending[(host, port)] = (client, hass.loop.call_later(PENDING_CLIENT_TIMEOUT, _expire))
+
+@callback
+def async_pop_pending_client(hass: HomeAssistant, host: str, port: int, discard: bool = False) -> Optional[OppoClient]:
+    """Claim (or discard) the pending client for a host, if there is one."""
+    entry = hass.data.get(DATA_PENDING_CLIENTS, {}).pop((host, port), None)
+    if entry is None:
+        return None
+    client, handle = entry
+    handle.cancel()
+    if discard:
+        hass.async_create_task(client.disconnect())
+        return None
+    return client
+
+async def async_broadcast_commands(
+    managers: Dict[str, "OppoUdpManager"],
+    commands: List[OppoRemoteCode],
+    delay: float = 0,
+    concurrency: int = BROADCAST_CONCURRENCY
+) -> Dict[str, dict]:
+    """Send a command sequence to several players concurrently, returns the result per player."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _send(manager: "OppoUdpManager") -> dict:
+        async with semaphore:
+            return await manager.async_send_commands(commands, delay)
+
+    results = await asyncio.gather(*[_send(manager) for manager in managers.values()])
+    return dict(zip(managers, results))
+
 class OppoUdpManager:
     """Manages a connection with an Oppo device including retries when the connection is dropped"""
     def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry) -> None:
@@ -25,13 +101,46 @@ def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry) -> None:
         self._config_entry = config_entry
         self._host_name = config_entry.data[CONF_HOST]
         self._port_number = config_entry.data[CONF_PORT]
-        self._mac_address = config_entry.data.get(CONF_MAC, None)
+        #the options hold the MAC address once it has been changed there, empty if removed
+        self._mac_address = config_entry.options.get(CONF_MAC, config_entry.data.get(CONF_MAC, None)) or None
+        self._heartbeat_handle = None
+        self._heartbeat_task = None
+        self._heartbeat_interval = None
+        self._last_message_at = 0.0
+        self._adaptive_verbose = config_entry.options.get(CONF_ADAPTIVE_VERBOSE, DEFAULT_ADAPTIVE_VERBOSE)
+        self._background_connections = config_entry.options.get(CONF_BACKGROUND_CONNECTIONS, DEFAULT_BACKGROUND_CONNECTIONS)
+        self._verbose_task = None
+        self._replaying = False
+        self._replay_task = None
+        self._retry_handle = None
+        self._reconnect_task = None
+        self._command_buffer = []  # type: List[BufferedCommand]
+        self._flush_task = None
+        self._power_on_requested_at = None
+        self._power_on_duration = None
+        self._restored_snapshot = None
+        self._last_known_snapshot = None
+        self._live = False
+        self._capture_path = hass.config.path(DOMAIN, f"{config_entry.entry_id}.capture.jsonl")
+        self._recorder = None
+        if config_entry.options.get(CONF_CAPTURE, DEFAULT_CAPTURE):
+            self._recorder = SessionRecorder(hass, self._capture_path)
+
+        if self._adaptive_verbose:
+            config_entry.async_on_unload(
+                async_dispatcher_connect(hass, SIGNAL_WEBSOCKET_CONNECTED, self._on_frontends_changed)
+            )
+            config_entry.async_on_unload(
+                async_dispatcher_connect(hass, SIGNAL_WEBSOCKET_DISCONNECTED, self._on_frontends_changed)
+            )
 
         self._reset_initialization()
 
     def _reset_initialization(self):
         self._client = None
         self._retry_count = 0
+        self._verbose_mode = None
+        self._snapshot = None
 
     @property
     def online(self) -> bool:
@@ -62,8 +171,74 @@ def device(self) -> OppoDevice:
     def hass(self) -> HomeAssistant:
         return self._hass
 
+    @property
+    def config_entry(self) -> ConfigEntry:
+        return self._config_entry
+
+    @property
+    def power_on_duration(self) -> Optional[float]:
+        """Seconds from the most recent power on request until the device reported being on"""
+        return self._power_on_duration
+
+    @property
+    def capture_path(self) -> str:
+        """Where the session capture is written"""
+        return self._capture_path
+
+    @property
+    def snapshot(self) -> Optional[OppoStateSnapshot]:
+        """
+        The device state as of the most recent SDK event, or the state restored at 
+        startup until the device has reported.
+        """
+        if self._restored_snapshot is not None:
+            return self._restored_snapshot
+        return self._snapshot
+
+    @property
+    def last_known_snapshot(self) -> Optional[OppoStateSnapshot]:
+        """The most recent snapshot taken while the device state was known, kept for restoring"""
+        if self._restored_snapshot is not None:
+            return self._restored_snapshot
+        return self._last_known_snapshot
+
+    @property
+    def snapshot_restored(self) -> bool:
+        """Indicates whether the snapshot was restored and not yet confirmed by the device"""
+        return self._restored_snapshot is not None
+
+    @property
+    def verbose_mode(self) -> Optional[SetVerboseMode]:
+        """The verbose mode most recently sent to the device"""
+        return self._verbose_mode
+
+    @property
+    def frontend_connections(self) -> int:
+        """
+        The number of open websocket connections.  The websocket API keeps the count, so 
+        connections opened before a reload are included.
+        """
+        return self.hass.data.get(DATA_CONNECTIONS, 0)
+
+    @property
+    def watched(self) -> bool:
+        """
+        Indicates whether a frontend is connected that may be showing the player.  The API
+        does not tell dashboards apart from other clients (companion apps, Node-RED), so
+        the configured number of connections that are always open is not counted.
+        """
+        return self.frontend_connections > self._background_connections
+
     async def async_start_client(self):
         """Start a new OppoClient in the HASS event loop."""
+        client = async_pop_pending_client(self.hass, self._host_name, self._port_number)
+        if client:
+            #connected is also true while the SDK is dropped or waiting to reconnect
+            if client.available:
+                await self._async_adopt_client(client)
+                return
+            await client.disconnect()
+
         try:
             _LOGGER.debug('Creating and starting client')
             await self._get_client()
@@ -77,9 +252,14 @@ async def async_start_client(self):
     @callback
     def reconnect(self, log=False) -> None:
         """Prepare to reconnect oppo_udp session."""
+        self._retry_handle = None
+        if self._reconnect_task and not self._reconnect_task.done():
+            #a second attempt would leave one of the two clients running orphaned
+            _LOGGER.debug("Reconnect already in progress")
+            return
         if log:
             _LOGGER.info("Will try to reconnect to oppo_udp device")
-        self.hass.loop.create_task(self.async_reconnect())
+        self._reconnect_task = self.hass.loop.create_task(self.async_reconnect())
 
     async def async_reconnect(self) -> None:
         """Try to reconnect oppo_udp session."""
@@ -87,11 +267,11 @@ async def async_reconnect(self) -> None:
         _LOGGER.info(f"attempting to reconnect to oppo_udp service (attempt {self._retry_count})")
         
         try:
-            with async_timeout.timeout(ASYNC_TIMEOUT):
+            async with async_timeout.timeout(ASYNC_TIMEOUT):
                 await self.async_start_client()
         except Exception as err:
             _LOGGER.warn(f"could not reconnect: {err}, will retry in {self._get_retry_delay()} seconds")
-            self.hass.loop.call_later(self._get_retry_delay(), self.reconnect)
+            self._schedule_reconnect(self._get_retry_delay())
             #_LOGGER.debug("forcing a state refresh while disconnected")
             #try:
             #    await self._refresh_ha_state()
@@ -99,8 +279,27 @@ async def async_reconnect(self) -> None:
             #    _LOGGER.debug(f"error refreshing state: {err}")
 
     async def disconnect(self) -> None:
-        """Disconnect from the device"""
+        """Disconnect from the device, stopping a replay that is running"""
         _LOGGER.debug("Disconnecting from device")
+        if self.replaying:
+            self._replay_task.cancel()
+            await asyncio.wait([self._replay_task])
+        self._replay_task = None
+        await self._async_close_session()
+        if self._recorder:
+            await self._recorder.async_close()
+
+    async def _async_close_session(self) -> None:
+        """Stop the heartbeat, reconnects and buffered commands and disconnect the client."""
+        self._stop_heartbeat()
+        self._cancel_reconnect()
+        if self._reconnect_task and not self._reconnect_task.done():
+            self._reconnect_task.cancel()
+        self._reconnect_task = None
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+        self._command_buffer.clear()
         try:
             if self._client:
                 self._client.clear_event_handlers()
@@ -109,19 +308,418 @@ async def disconnect(self) -> None:
         except:
             _LOGGER.exception("An error occurred while disconnecting")
 
+    async def async_power_on(self) -> None:
+        """
+        Turn the device on.  Without a live session the device may be in deep standby,
+        so wake it over the network, reconnect right away instead of waiting for the 
+        backoff and buffer the power on until the session is up.
+        """
+        self._power_on_requested_at = self.hass.loop.time()
+        command = OppoRemoteCommand(OppoRemoteCode.PON)
+        if self._client and self._client.available:
+            await self.async_send_command(command)
+            return
+
+        self._buffer_command(command, WAKE_TIMEOUT)
+
+        if self._mac_address:
+            _LOGGER.debug(f"Sending magic packet to {self._mac_address}")
+            try:
+                await self.hass.async_add_executor_job(wakeonlan.send_magic_packet, self._mac_address)
+            except (OSError, ValueError) as err:
+                _LOGGER.warning(f"Could not send magic packet to {self._mac_address}: {err}")
+        self._cancel_reconnect()
+        self.reconnect(True)
+
+    async def async_send_command(self, command: OppoCommand, ttl: float = COMMAND_TTL, delay: float = 0) -> bool:
+        """
+        Send a command, or buffer it for a few seconds while there is no live session so
+        that it is sent once the session is up.  The delay is the time the caller waits 
+        before its next command (remote macros), it is kept between buffered commands.
+        Returns whether it was sent right away.
+        """
+        if self._client and self._client.available and not self._command_buffer:
+            await self._client.async_send_command(command)
+            return True
+        self._buffer_command(command, ttl, delay)
+        if self._client and self._client.available:
+            self._start_flush()
+        return False
+
+    @callback
+    def _buffer_command(self, command: OppoCommand, ttl: float, delay: float = 0) -> None:
+        """Queue a command, dropping expired and superseded ones."""
+        now = self.hass.loop.time()
+        self._command_buffer = [b for b in self._command_buffer if b.expires_at > now]
+        if command.code.value == OppoRemoteCode.POW.value:
+            pending = next((b for b in reversed(self._command_buffer) if b.command.code.value in POWER_CODES), None)
+            if pending:
+                #a toggle flips a pending power on/off, two toggles cancel each other out
+                self._command_buffer.remove(pending)
+                toggled = TOGGLED_POWER_CODES.get(pending.command.code.value)
+                if toggled is None:
+                    _LOGGER.debug("Dropping buffered power toggle")
+                    return
+                _LOGGER.debug(f"Power toggle turns buffered {pending.command.code.value} into {toggled.value}")
+                command = OppoRemoteCommand(toggled)
+
+        code = command.code.value
+        self._command_buffer = [b for b in self._command_buffer if not _supersedes(command, b.command)]
+        if len(self._command_buffer) >= COMMAND_BUFFER_SIZE:
+            _LOGGER.warning(f"Command buffer full, dropping {self._command_buffer[0].command.code.value}")
+            self._command_buffer.pop(0)
+        _LOGGER.debug(f"Buffering {code} for {ttl} seconds")
+        self._command_buffer.append(BufferedCommand(command, now + ttl, delay))
+
+    @callback
+    def _start_flush(self) -> None:
+        """Start sending the buffered commands, unless that is already happening."""
+        if self._command_buffer and not (self._flush_task and not self._flush_task.done()):
+            self._flush_task = self.hass.async_create_task(self._async_flush_commands())
+
+    async def _async_flush_commands(self) -> None:
+        """Send the buffered commands that have not expired, in order and with their delays."""
+        while self._command_buffer and self._client and self._client.available:
+            buffered = self._command_buffer.pop(0)
+            if buffered.expires_at <= self.hass.loop.time():
+                _LOGGER.debug(f"Dropping expired command {buffered.command.code.value}")
+                continue
+            await self._client.async_send_command(buffered.command)
+            if buffered.delay and self._command_buffer:
+                await asyncio.sleep(buffered.delay)
+
+    async def async_send_commands(self, commands: List[OppoRemoteCode], delay: float = 0) -> dict:
+        """
+        Send a sequence of remote commands.  Returns whether the device accepted every 
+        command and how long the sequence took.
+        """
+        if not (self._client and self._client.available):
+            return {"success": False, "error": "not connected", "latency_ms": None}
+
+        started_at = self.hass.loop.time()
+        error = None
+        try:
+            for i, code in enumerate(commands):
+                if i and delay:
+                    await asyncio.sleep(delay)
+                if not (self._client and self._client.available):
+                    error = error or "not connected"
+                    break
+                response = await self._async_send_confirmed(OppoRemoteCommand(code))
+                if error is None and response is None:
+                    error = "no response"
+                elif error is None and response.result != ResultCode.OK:
+                    error = "rejected"
+        except Exception as err:
+            _LOGGER.warning(f"Could not send commands: {err}")
+            return {"success": False, "error": str(err), "latency_ms": None}
+
+        return {
+            "success": error is None,
+            "error": error,
+            "latency_ms": round((self.hass.loop.time() - started_at) * 1000, 1),
+        }
+
+    async def _async_send_confirmed(self, command: OppoCommand) -> Optional[OppoResponse]:
+        """
+        Send a command and return the response the device gave to it, or None if it did 
+        not answer in time.  The client sends one command at a time, so the first response
+        after this command went out belongs to it (time codes and other updates are not 
+        responses).
+        """
+        client = self._client
+        responses = []  # type: List[OppoResponse]
+        sent = False
+
+        async def _on_sent(sent_command: OppoCommand):
+            nonlocal sent
+            sent = sent or sent_command is command
+
+        async def _on_response(response: OppoResponse):
+            if sent and not responses:
+                responses.append(response)
+
+        client.add_event_handler(EVENT_COMMAND_SENT, _on_sent)
+        client.add_event_handler(EVENT_COMMAND_RESPONSE, _on_response)
+        try:
+            await client.async_send_command(command)
+        finally:
+            #the SDK's remove_event_handler does not work, and a disconnect replaces the lists
+            for event, handler in ((EVENT_COMMAND_SENT, _on_sent), (EVENT_COMMAND_RESPONSE, _on_response)):
+                if handler in client.event_handlers[event]:
+                    client.event_handlers[event].remove(handler)
+        return responses[0] if responses else None
+
+    @property
+    def _waking(self) -> bool:
+        """Indicates whether a power on is waiting for the session to come up"""
+        return (
+            self._power_on_requested_at is not None and 
+            self.hass.loop.time() - self._power_on_requested_at < WAKE_TIMEOUT
+        )
+
+    @property
+    def replaying(self) -> bool:
+        """Indicates whether a capture replay is running (or about to start)"""
+        return self._replay_task is not None and not self._replay_task.done()
+
+    @callback
+    def async_start_replay(self, path: str, speed: float = 1.0) -> None:
+        """
+        Replay a capture in the background.  The replay is reserved right away, so a 
+        second request can be rejected before this one has started.
+        """
+        self._replay_task = self.hass.async_create_task(self.async_replay(path, speed))
+
+    async def async_replay(self, path: str, speed: float = 1.0) -> int:
+        """
+        Replace the live session with a replay of a capture, then reconnect.  Returns
+        the number of messages replayed.  A cancelled replay (on unload) does not reconnect.
+        """
+        try:
+            records = await self.hass.async_add_executor_job(load_capture, path)
+        except (OSError, ValueError) as err:
+            _LOGGER.error(f"Could not read capture {path}: {err}")
+            return 0
+        _LOGGER.info(f"Replaying {len(records)} records from {path} at speed {speed}")
+        await self._async_close_session()
+        self._replaying = True
+        count = 0
+        try:
+            self._reset_initialization()
+            client = OppoReplayClient(self._host_name, self._port_number, self._mac_address, event_loop=self.hass.loop)
+            self._client = self._attach_client(client)
+            self.refresh_snapshot()
+            count = await async_replay_capture(client, records, speed)
+            _LOGGER.info(f"Replayed {count} messages from {path}, reconnecting")
+        except Exception:
+            _LOGGER.exception(f"Replaying {path} failed, reconnecting")
+        finally:
+            self._replaying = False
+        await self.async_start_client()
+        return count
+
+    @callback
+    def restore_snapshot(self, snapshot: OppoStateSnapshot) -> None:
+        """Publish the last known state until the device reports."""
+        if not self._live and self._restored_snapshot is None:
+            _LOGGER.debug("Restored the last known device state")
+            self._restored_snapshot = snapshot
+
+    def refresh_snapshot(self) -> Optional[OppoStateSnapshot]:
+        """Capture the device state once for all entities."""
+        self._snapshot = OppoStateSnapshot.from_device(self.device)
+        if self._snapshot and self._snapshot.power_status not in (PowerStatus.DISCONNECTED, PowerStatus.UNKNOWN):
+            self._last_known_snapshot = self._snapshot
+        return self._snapshot
+
+    def diagnostics(self) -> dict:
+        """Connection and state information for diagnostics"""
+        return {
+            "connected": bool(self.connected),
+            "online": self.online,
+            "retry_count": self._retry_count,
+            "heartbeat_interval": self._heartbeat_interval,
+            "power_on_duration": self._power_on_duration,
+            "verbose_mode": str(self._verbose_mode),
+            "watched": self.watched,
+            "frontend_connections": self.frontend_connections,
+            "background_connections": self._background_connections,
+            "replaying": self._replaying,
+            "capture": self._recorder.path if self._recorder else None,
+            "snapshot": self._snapshot.as_dict() if self._snapshot else None,
+            "snapshot_restored": self.snapshot_restored,
+            "buffered_commands": [b.command.code.value for b in self._command_buffer],
+            "resources": self._resource_counts(),
+        }
+
+    def _resource_counts(self) -> dict:
+        """Handlers, timers and tasks held by the session, these should not grow over time"""
+        handlers = self._client.event_handlers if self._client else {}
+        return {
+            "event_handlers": {event: len(callbacks) for event, callbacks in handlers.items()},
+            "timers": sum(1 for handle in (self._heartbeat_handle, self._retry_handle) if handle),
+            "tasks": sum(
+                1 for task in (self._heartbeat_task, self._verbose_task, self._reconnect_task, self._flush_task, self._replay_task) 
+                if task and not task.done()
+            ),
+        }
+
     async def on_device_state_updated(self, device: OppoDevice):        
-        pass
+        """
+        Capture the new state and reschedule the heartbeat if the playback state changed 
+        its interval.  The SDK schedules handlers in registration order, so this runs 
+        before the entity handlers that read the snapshot.
+        """
+        self._live = True
+        self._restored_snapshot = None
+        self.refresh_snapshot()
+        self._update_power_on_duration()
+        if self._recorder and not self._replaying:
+            self._recorder.record_state(self._snapshot)
+        if self._heartbeat_handle and self._get_heartbeat_interval() != self._heartbeat_interval:
+            self._schedule_heartbeat()
+        self._update_verbose_mode()
+
+    async def on_command_sent(self, command):
+        """Keep track of the verbose mode, the SDK changes it on its own during updates."""
+        if isinstance(command, OppoSetVerboseModeCommand):
+            self._verbose_mode = command._parameters[0]
+
+    async def on_message_received(self, _):
+        """Record when we last heard from the device."""
+        self._last_message_at = self.hass.loop.time()
 
     async def on_disconnect(self, _):
         """Handle disconnection."""
-        _LOGGER.debug(f"Disconnected. Attempting to reconnect in {MIN_RETRY_DELAY} seconds")
-        self.hass.loop.call_later(MIN_RETRY_DELAY, self.reconnect, True)
+        delay = WAKE_RETRY_INTERVAL if self._waking else MIN_RETRY_DELAY
+        _LOGGER.debug(f"Disconnected. Attempting to reconnect in {delay} seconds")
+        self._stop_heartbeat()
+        self.refresh_snapshot()
+        self._schedule_reconnect(delay, True)
         self._dispatch_send(SIGNAL_DISCONNECTED)
 
     async def on_connect(self, _):
         """Set state upon connection."""
         self._retry_count = 0
+        self._last_message_at = self.hass.loop.time()
+        self._cancel_reconnect()
+        self.refresh_snapshot()
+        self._schedule_heartbeat()
         self._dispatch_send(SIGNAL_CONNECTED, self.device)
+        self._start_flush()
+
+    @callback
+    def _schedule_reconnect(self, delay: float, log=False) -> None:
+        """Schedule a reconnect, replacing any that is already scheduled."""
+        self._cancel_reconnect()
+        self._retry_handle = self.hass.loop.call_later(delay, self.reconnect, log)
+
+    @callback
+    def _cancel_reconnect(self) -> None:
+        """Cancel a scheduled reconnect."""
+        if self._retry_handle:
+            self._retry_handle.cancel()
+            self._retry_handle = None
+
+    @callback
+    def _update_power_on_duration(self) -> None:
+        """Measure the time to ready once a requested power on completes."""
+        if self._power_on_requested_at is None or self._snapshot is None:
+            return
+        if self._snapshot.power_status == PowerStatus.ON:
+            self._power_on_duration = round(self.hass.loop.time() - self._power_on_requested_at, 3)
+            self._power_on_requested_at = None
+            _LOGGER.debug(f"Device ready {self._power_on_duration} seconds after power on")
+        elif not self._waking:
+            self._power_on_requested_at = None
+
+    @callback
+    def _on_frontends_changed(self) -> None:
+        """Handle a frontend connecting to or disconnecting from Home Assistant."""
+        self._update_verbose_mode()
+
+    def _get_verbose_mode(self) -> SetVerboseMode:
+        """
+        Determine the verbose mode the device should be in.  Per-second time code updates
+        are only worth their traffic while something is playing and someone may be watching,
+        otherwise status changes are enough and the position is extrapolated.
+        """
+        if not self._adaptive_verbose or (self.watched and self._playing):
+            return SetVerboseMode.VERBOSE
+        return SetVerboseMode.INFO
+
+    @callback
+    def _update_verbose_mode(self) -> None:
+        """Switch the verbose mode of the device if needed."""
+        if not self._adaptive_verbose or not self.connected:
+            return
+        if self.device.is_updating or (self._verbose_task and not self._verbose_task.done()):
+            return
+        mode = self._get_verbose_mode()
+        if mode != self._verbose_mode:
+            self._verbose_task = self.hass.loop.create_task(self._async_set_verbose_mode(mode))
+
+    async def _async_set_verbose_mode(self, mode: SetVerboseMode) -> None:
+        """Send the verbose mode to the device, resyncing media info when time codes resume."""
+        _LOGGER.debug(f"Switching verbose mode to {mode}")
+        device = self.device
+        await self.client.async_send_command(OppoSetVerboseModeCommand(mode))
+        if mode == SetVerboseMode.VERBOSE and self._playing:
+            await device.async_request_media_update(False)
+
+    @property
+    def _playing(self) -> bool:
+        """Indicates whether the device is on and playing, as of the latest snapshot"""
+        snapshot = self._snapshot
+        return bool(snapshot and snapshot.power_status == PowerStatus.ON and snapshot.is_playing)
+
+    def _get_heartbeat_interval(self) -> int:
+        """Heartbeat often while playing, rarely while idle."""
+        if self._playing:
+            return HEARTBEAT_PLAYING_INTERVAL
+        return HEARTBEAT_IDLE_INTERVAL
+
+    @callback
+    def _schedule_heartbeat(self) -> None:
+        """Schedule the next heartbeat based on the current playback state."""
+        if self._heartbeat_handle:
+            self._heartbeat_handle.cancel()
+            self._heartbeat_handle = None
+        if self._replaying:
+            return
+        self._heartbeat_interval = self._get_heartbeat_interval()
+        self._heartbeat_handle = self.hass.loop.call_later(self._heartbeat_interval, self._heartbeat)
+
+    @callback
+    def _stop_heartbeat(self) -> None:
+        """Stop any scheduled or running heartbeat."""
+        if self._heartbeat_handle:
+            self._heartbeat_handle.cancel()
+            self._heartbeat_handle = None
+        if self._heartbeat_task and not self._heartbeat_task.done():
+            self._heartbeat_task.cancel()
+        self._heartbeat_task = None
+
+    @callback
+    def _heartbeat(self) -> None:
+        """Start a heartbeat check."""
+        self._heartbeat_handle = None
+        self._heartbeat_task = self.hass.loop.create_task(self._async_heartbeat())
+
+    async def _async_heartbeat(self) -> None:
+        """
+        Verify that the session is still alive.  If the device has been chatty since the 
+        last heartbeat, that is proof enough, otherwise query the power status and 
+        declare the session dead if nothing comes back before the deadline.
+        """
+        client = self._client
+        if not self.connected:
+            return
+
+        sent_at = self.hass.loop.time()
+        if sent_at - self._last_message_at < self._heartbeat_interval:
+            self._schedule_heartbeat()
+            return
+
+        try:
+            async with async_timeout.timeout(HEARTBEAT_TIMEOUT):
+                await client.async_send_command(OppoQueryCommand(OppoQueryCode.QPW))
+        except asyncio.TimeoutError:
+            pass
+
+        if client is not self._client:
+            return
+        if self._last_message_at >= sent_at:
+            self._heartbeat_task = None
+            self._schedule_heartbeat()
+            return
+
+        _LOGGER.warning(f"no heartbeat response within {HEARTBEAT_TIMEOUT} seconds, reconnecting")
+        self._heartbeat_task = None
+        self.refresh_snapshot()
+        self._dispatch_send(SIGNAL_DISCONNECTED)
+        self.reconnect()
 
     def _create_oppo_client(self, event_loop: Optional[asyncio.AbstractEventLoop]) -> OppoClient:
         """
@@ -131,9 +729,17 @@ def _create_oppo_client(self, event_loop: Optional[asyncio.AbstractEventLoop]) -
         :return: OppoClient
         """
         client = OppoClient(self._host_name, self._port_number, self._mac_address, event_loop=event_loop)
+        return self._attach_client(client)
+
+    def _attach_client(self, client: OppoClient) -> OppoClient:
+        """Register the manager callbacks on a client and announce it to the entities."""
         client.add_event_handler(EVENT_DEVICE_STATE_UPDATED, self.on_device_state_updated)
         client.add_event_handler(EVENT_DISCONNECTED, self.on_disconnect)
         client.add_event_handler(EVENT_CONNECTED, self.on_connect)
+        client.add_event_handler(EVENT_MESSAGE_RECEIVED, self.on_message_received)
+        client.add_event_handler(EVENT_COMMAND_SENT, self.on_command_sent)
+        if self._recorder and not self._replaying:
+            self._recorder.attach(client)
 
         #send a signal to all associated entities that we have a new client
         self._dispatch_send(SIGNAL_CLIENT_CREATED, client)
@@ -152,8 +758,23 @@ async def _get_client(self) -> OppoClient:
         
         loop = self._hass.loop
         self._client = self._create_oppo_client(event_loop=loop)
+        self.refresh_snapshot()
         return self._client
 
+    async def _async_adopt_client(self, client: OppoClient) -> None:
+        """
+        Take over a live client (from the config flow).  Its connect 
+        event has already fired, so the connection handling is run directly.  The same
+        goes for the disc id it read during the flow, which is announced again for
+        the entities that only just registered their handlers.
+        """
+        _LOGGER.debug('Adopting connected client')
+        self._reset_initialization()
+        self._client = self._attach_client(client)
+        await self.on_connect(client)
+        if client.device.cddb_id:
+            await client.async_event(EVENT_DISC_ID_CHANGED, client.device)
+
     def _dispatch_send(self, signal, *args):
         """Dispatch a signal to all entities managed by this manager."""
         async_dispatcher_send(
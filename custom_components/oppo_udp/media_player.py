@@ -1,6 +1,7 @@
 """Support for Oppo UDP-20x media player."""
+import asyncio
 from datetime import timedelta
-from string import Template
+from functools import lru_cache
 from typing import Optional
 import logging
 import musicbrainzngs
@@ -14,22 +15,38 @@
     RepeatMode,
 )
 
-from homeassistant.const import (
-    CONF_HOST,
-    STATE_PAUSED,
-    STATE_PLAYING,
-)
+from homeassistant.const import CONF_HOST
 from homeassistant.core import callback
 import homeassistant.util.dt as dt_util
 
 from oppoudpsdk import EVENT_DEVICE_STATE_UPDATED, EVENT_DISC_ID_CHANGED
-from oppoudpsdk import OppoClient, OppoDevice, OppoPlaybackStatus, OppoRemoteCode
-from oppoudpsdk import SetInputSource, SetRepeatMode, SetSearchMode
+from oppoudpsdk import OppoClient, OppoDevice, OppoRemoteCode
+from oppoudpsdk import SetInputSource, SetRepeatMode, SetVerboseMode
+from oppoudpsdk import OppoRemoteCommand, OppoSetInputSourceCommand, OppoSetRepeatModeCommand, OppoSetVolumeLevelCommand
+from oppoudpsdk import OppoSetChapterPositionCommand, OppoSetTitlePositionCommand
 from oppoudpsdk import DiscType, PlayStatus, RepeatMode as OppoRepeatMode, PowerStatus
 from oppoudpsdk.const import *
 
-from .entity import OppoUdpEntity
-from .const import DOMAIN
+from .artwork import artwork_url, get_artwork_cache
+from .entity import OppoUdpEntity, OppoUdpExtraStoredData
+from .const import (
+    DOMAIN, 
+    POSITION_DRIFT_THRESHOLD, 
+    CONF_DURATION_FORMAT, 
+    DEFAULT_DURATION_FORMAT, 
+    DURATION_FORMAT_SECONDS,
+    CONF_ATTRIBUTE_TIER,
+    DEFAULT_ATTRIBUTE_TIER,
+    ATTRIBUTE_TIER_ESSENTIAL,
+    ATTRIBUTE_TIER_DEBUG,
+    ATTR_POSITION,
+    ATTR_POSITION_UPDATED_AT,
+    ATTR_VERBOSE_MODE,
+    ATTR_WATCHED,
+    ATTR_POWER_ON_DURATION,
+    ATTR_RESTORED,
+    MUSICBRAINZ_TIMEOUT
+)
 from .musicbrainz import async_musicbrainz_get_info, MusicBrainzInfo
 
 _LOGGER = logging.getLogger(__name__)
@@ -42,27 +59,122 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     manager = hass.data[DOMAIN][config_entry.entry_id]
     async_add_entities([OppoUdpMediaPlayer(host, DOMAIN, config_entry.entry_id, manager)])
 
-class DeltaTemplate(Template):
-    delimiter = "%"
+PLAY_STATUS_STATES = {
+    PlayStatus.OFF: MediaPlayerState.OFF,
+    PlayStatus.SETUP: MediaPlayerState.IDLE,
+    PlayStatus.HOME_MENU: MediaPlayerState.IDLE,
+    PlayStatus.MEDIA_CENTER: MediaPlayerState.IDLE,
+    PlayStatus.PLAY: MediaPlayerState.PLAYING,
+    PlayStatus.DISC_MENU: MediaPlayerState.PLAYING,
+    PlayStatus.PAUSE: MediaPlayerState.PAUSED,
+    PlayStatus.SLOW_FORWARD: MediaPlayerState.PAUSED,
+    PlayStatus.SLOW_REVERSE: MediaPlayerState.PAUSED,
+    PlayStatus.FAST_FORWARD: MediaPlayerState.PAUSED,
+    PlayStatus.FAST_REVERSE: MediaPlayerState.PAUSED,
+}
+
+DISC_TYPE_MEDIA_TYPES = {
+    DiscType.BLURAY: MediaType.VIDEO,
+    DiscType.UHD_BLURAY: MediaType.VIDEO,
+    DiscType.DVD_VIDEO: MediaType.VIDEO,
+    DiscType.VCD2: MediaType.VIDEO,
+    DiscType.SVCD: MediaType.VIDEO,
+    DiscType.DVD_AUDIO: MediaType.MUSIC,
+    DiscType.SACD: MediaType.MUSIC,
+    DiscType.CDDA: MediaType.MUSIC,
+}
+
+DISC_TYPE_TITLES = {
+    DiscType.BLURAY: "Blu-ray Disc",
+    DiscType.UHD_BLURAY: "UHD Blu-ray Disc",
+    DiscType.DVD_VIDEO: "DVD",
+    DiscType.VCD2: "Video CD",
+    DiscType.SVCD: "Super Video CD",
+    DiscType.NONE: "No Disc"
+}
+
+REPEAT_MODES = {
+    OppoRepeatMode.REPEAT_ALL: RepeatMode.ALL,
+    OppoRepeatMode.REPEAT_TITLE: RepeatMode.ONE,
+    OppoRepeatMode.REPEAT_CHAPTER: RepeatMode.ONE,
+    OppoRepeatMode.REPEAT_ONE: RepeatMode.ONE,
+    OppoRepeatMode.SHUFFLE: RepeatMode.OFF,
+    OppoRepeatMode.RANDOM: RepeatMode.OFF,
+    OppoRepeatMode.OFF: RepeatMode.OFF
+}
+
+SOURCE_LIST = [e.name.replace("_"," ").title() for e in SetInputSource]
+
+SUPPORTED_FEATURES = (
+    MediaPlayerEntityFeature.PLAY
+    | MediaPlayerEntityFeature.PLAY_MEDIA
+    | MediaPlayerEntityFeature.PAUSE
+    | MediaPlayerEntityFeature.STOP
+    | MediaPlayerEntityFeature.VOLUME_SET
+    | MediaPlayerEntityFeature.VOLUME_MUTE
+    | MediaPlayerEntityFeature.BROWSE_MEDIA
+    | MediaPlayerEntityFeature.SEEK
+    | MediaPlayerEntityFeature.TURN_OFF
+    | MediaPlayerEntityFeature.TURN_ON
+    | MediaPlayerEntityFeature.REPEAT_SET
+    | MediaPlayerEntityFeature.SHUFFLE_SET
+    | MediaPlayerEntityFeature.NEXT_TRACK
+    | MediaPlayerEntityFeature.PREVIOUS_TRACK
+    | MediaPlayerEntityFeature.SELECT_SOURCE
+    | MediaPlayerEntityFeature.VOLUME_STEP
+)
 
-def strfdelta(tdelta, fmt):
-    d = {"D": tdelta.days}
-    hours, rem = divmod(tdelta.seconds, 3600)
+@lru_cache(maxsize=4096)
+def format_duration(seconds: int) -> str:
+    """Format whole seconds as HH:MM:SS, repeated values come from the cache."""
+    hours, rem = divmod(seconds % 86400, 3600)
     minutes, seconds = divmod(rem, 60)
-    d["H"] = '{:02d}'.format(hours)
-    d["M"] = '{:02d}'.format(minutes)
-    d["S"] = '{:02d}'.format(seconds)
-    t = DeltaTemplate(fmt)
-    return t.substitute(**d)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
 class OppoUdpMediaPlayer(OppoUdpEntity, MediaPlayerEntity):
     """Representation of an Oppo UDP media player."""
 
+    #attributes that change during playback are kept live but out of the recorder
+    _unrecorded_attributes = frozenset({
+        ATTR_DEVICE_SUBTITLE_SHIFT,
+        ATTR_DEVICE_OSD_POSITION,
+        ATTR_PLAYBACK_TRACK,
+        ATTR_PLAYBACK_CHAPTER,
+        ATTR_PLAYBACK_CHAPTER_TOTAL,
+        ATTR_PLAYBACK_TRACK_ELAPSED_TIME,
+        ATTR_PLAYBACK_TRACK_REMAINING_TIME,
+        ATTR_PLAYBACK_TRACK_DURATION,
+        ATTR_PLAYBACK_CHAPTER_ELAPSED_TIME,
+        ATTR_PLAYBACK_CHAPTER_REMAINING_TIME,
+        ATTR_PLAYBACK_CHAPTER_DURATION,
+        ATTR_PLAYBACK_TOTAL_ELAPSED_TIME,
+        ATTR_PLAYBACK_TOTAL_REMAINING_TIME,
+        ATTR_PLAYBACK_AUDIO_TYPE,
+        ATTR_PLAYBACK_SUBTITLE_TYPE,
+        ATTR_POSITION,
+        ATTR_POSITION_UPDATED_AT,
+        ATTR_VERBOSE_MODE,
+        ATTR_WATCHED,
+        ATTR_POWER_ON_DURATION,
+    })
+
     def __init__(self, host, name, identifier, manager, **kwargs):
         """Initialize the Oppo UDP media player."""
         super().__init__(host, name, identifier, manager, **kwargs)
         musicbrainzngs.set_useragent("Python HA OppoUDP Integration","0.1.11","(https://github.com/simbaja/ha_oppoudp)")
         self._musicbrainz_info = None
+        self._artwork_release_id = None
+        self._metadata_task = None
+        self._position = None
+        self._position_updated_at = None
+        self._position_key = None
+        self._last_time_codes = None
+        self._last_state_key = None
+        if manager.config_entry.options.get(CONF_DURATION_FORMAT, DEFAULT_DURATION_FORMAT) == DURATION_FORMAT_SECONDS:
+            self._format_duration = int
+        else:
+            self._format_duration = format_duration
+        self._attribute_tier = manager.config_entry.options.get(CONF_ATTRIBUTE_TIER, DEFAULT_ATTRIBUTE_TIER)
 
     @property
     def musicbrainz_info(self) -> MusicBrainzInfo:
@@ -74,143 +186,233 @@ def async_client_created(self, client: OppoClient):
         client.add_event_handler(EVENT_DEVICE_STATE_UPDATED, self._on_device_state_updated)
         client.add_event_handler(EVENT_DISC_ID_CHANGED, self._on_disc_id_changed)
 
+    @callback
+    def async_device_disconnected(self):
+        """Handle when connection was lost to device."""
+        self._reset_position()
+
     async def _on_device_state_updated(self, device: OppoDevice):
-        """Handle a device state update event"""        
-        self.schedule_update_ha_state()
+        """
+        Handle a device state update event.  Time code ticks that agree with the 
+        extrapolated position are not written, the frontend extrapolates between writes.
+        """
+        position_changed = self._update_position()
+        state_key = (self.snapshot.state_key(), self.restored) if self.snapshot else None
+        if position_changed or state_key != self._last_state_key:
+            self._last_state_key = state_key
+            self.schedule_update_ha_state()
+
+    @property
+    def extra_restore_state_data(self) -> OppoUdpExtraStoredData:
+        """The state to restore after a restart, the artwork is downloaded again when needed"""
+        return OppoUdpExtraStoredData(self._manager.last_known_snapshot, self._musicbrainz_info)
+
+    @callback
+    def async_restore(self, data: OppoUdpExtraStoredData):
+        """Restore the MusicBrainz metadata along with the state, if it is for the same disc."""
+        super().async_restore(data)
+        info = data.musicbrainz_info
+        if info and data.snapshot and info.disc_id == data.snapshot.cddb_id:
+            self._set_musicbrainz_info(info)
+            self._artwork_release_id = info.release_id
+
+    async def async_will_remove_from_hass(self):
+        """Stop resolving metadata and let go of the artwork when the entity goes away."""
+        self._cancel_metadata()
+        if self._musicbrainz_info and self._musicbrainz_info.release_id:
+            get_artwork_cache(self.hass).release(self._musicbrainz_info.release_id)
+        await super().async_will_remove_from_hass()
+
+    @callback
+    def _set_musicbrainz_info(self, info: Optional[MusicBrainzInfo]):
+        """Switch the metadata, only the artwork of the current release can be served."""
+        cache = get_artwork_cache(self.hass)
+        if info and info.release_id:
+            cache.allow(info.release_id)
+        if self._musicbrainz_info and self._musicbrainz_info.release_id:
+            cache.release(self._musicbrainz_info.release_id)
+        self._musicbrainz_info = info
 
     async def _on_disc_id_changed(self, device: OppoDevice):
-        """Handle when the disc id changes"""
-        self._musicbrainz_info = await async_musicbrainz_get_info(device.cddb_id)
-        pass
+        """Handle when the disc id changes, metadata for the previous disc is dropped."""
+        info = self._musicbrainz_info
+        if info and info.disc_id == device.cddb_id and self._metadata_task is None:
+            #restored at startup and confirmed by the device
+            return
+        self._cancel_metadata()
+        self._set_musicbrainz_info(None)
+        self._artwork_release_id = None
+        self.schedule_update_ha_state()
+        if device.cddb_id:
+            self._metadata_task = self.hass.async_create_task(self._async_resolve_metadata(device.cddb_id))
+
+    def _cancel_metadata(self):
+        if self._metadata_task and not self._metadata_task.done():
+            self._metadata_task.cancel()
+        self._metadata_task = None
+
+    async def _async_resolve_metadata(self, disc_id: str):
+        """
+        Publish the metadata in stages: the release, artist, title and track titles come in a
+        single MusicBrainz response and are written right away, the artwork follows once it
+        has been downloaded.
+        """
+        info = await async_musicbrainz_get_info(disc_id)
+        self._set_musicbrainz_info(info)
+        self.async_write_ha_state()
+        if not info.release_id:
+            return
+
+        cache = get_artwork_cache(self.hass)
+        try:
+            artwork = await asyncio.wait_for(cache.async_get(info.release_id), MUSICBRAINZ_TIMEOUT)
+        except asyncio.TimeoutError:
+            _LOGGER.info(f"Timed out getting artwork for release {info.release_id}")
+            return
+        if artwork:
+            self._artwork_release_id = info.release_id
+            self.async_write_ha_state()
+
+    def _reset_position(self):
+        """Clear the media position anchor"""
+        self._position = None
+        self._position_updated_at = None
+        self._position_key = None
+
+    def _update_position(self) -> bool:
+        """
+        Re-anchor the media position on discontinuities (seek, track/chapter change, 
+        pause/resume or drift from the extrapolated position).  Returns True if the 
+        anchor moved.  Drift is only checked when the device refreshed the time codes
+        or is streaming them, otherwise the reported position is just stale (no time
+        codes are sent in the info verbose mode).
+        """
+        state = self.state
+        position = self._get_device_position()
+        time_codes = self.snapshot.time_codes() if self.snapshot else None
+        refreshed = time_codes != self._last_time_codes
+        self._last_time_codes = time_codes
+        if position is None or state not in (MediaPlayerState.PLAYING, MediaPlayerState.PAUSED):
+            changed = self._position is not None
+            self._reset_position()
+            return changed
+
+        now = dt_util.utcnow()
+        key = (state, self.snapshot.track, self.snapshot.chapter)
+        if key == self._position_key:
+            if not refreshed and self._manager.verbose_mode != SetVerboseMode.VERBOSE:
+                return False
+            expected = self._position
+            if state == MediaPlayerState.PLAYING:
+                expected += (now - self._position_updated_at).total_seconds()
+            if abs(position - expected) <= POSITION_DRIFT_THRESHOLD:
+                return False
+
+        self._position = position
+        self._position_updated_at = now
+        self._position_key = key
+        return True
+
+    def _get_device_position(self) -> Optional[int]:
+        """Position of current playing media in seconds, as reported by the device."""
+        media_type = self.media_content_type
+        if media_type == MediaType.MUSIC:
+            return self.snapshot.track_elapsed_time
+        if media_type == MediaType.VIDEO:
+            return self.snapshot.total_elapsed_time
+        return None
 
     @property
     def state(self):
         """Return the state of the device."""
         if not self.available:
             return None
-        if self.device is None:
+        snapshot = self.snapshot
+        if snapshot is None:
             return None
-        if self.device.power_status == PowerStatus.DISCONNECTED:
+        if snapshot.power_status == PowerStatus.DISCONNECTED:
             return None
-        if self.device.power_status in [PowerStatus.OFF, PowerStatus.UNKNOWN]:
+        if snapshot.power_status in [PowerStatus.OFF, PowerStatus.UNKNOWN]:
             return MediaPlayerState.OFF
-        if self.playback_status:
-            state = self.playback_status
-            if state == PlayStatus.OFF:
-                return MediaPlayerState.OFF        
-            if state in [PlayStatus.SETUP, PlayStatus.HOME_MENU, PlayStatus.MEDIA_CENTER]:
-                return MediaPlayerState.IDLE
-            if state in [PlayStatus.PLAY, PlayStatus.DISC_MENU]:
-                return MediaPlayerState.PLAYING
-            if state in [PlayStatus.PAUSE, PlayStatus.SLOW_FORWARD, PlayStatus.SLOW_REVERSE, PlayStatus.FAST_FORWARD, PlayStatus.FAST_REVERSE]:
-                return MediaPlayerState.PAUSED
-            return MediaPlayerState.STANDBY
+        if snapshot.playback_status:
+            return PLAY_STATUS_STATES.get(snapshot.playback_status, MediaPlayerState.STANDBY)
         return None
 
     @property
     def device_class(self):
         return MediaPlayerDeviceClass.TV
 
-    @property
-    def playback_info(self) -> OppoPlaybackStatus:
-        """The current playback info"""
-        if not self.device:
-            return None
-        return self.device.playback_attributes
-    
     @property
     def playback_status(self) -> PlayStatus:
         """The current playback status"""
-        if not self.device:
+        if not self.snapshot:
             return None        
-        return self.device.playback_status
+        return self.snapshot.playback_status
 
     @property
     def volume_level(self):
         """Volume level of the media player (0..1)."""
-        if self.device:
-            return float(self.device.volume) / 100.0
+        if self.snapshot:
+            return float(self.snapshot.volume) / 100.0
         return None
 
     @property
     def is_volume_muted(self):
         """Boolean if volume is currently muted."""
-        if self.device:
-            return self.device.is_muted
+        if self.snapshot:
+            return self.snapshot.is_muted
         return None        
 
     @property
     def media_content_type(self):
         """Content type of current playing media."""
-
-        if self.device:
+        if self.snapshot:
             #map disc types to media type, assume video if none
-            return {
-                DiscType.BLURAY: MediaType.VIDEO,
-                DiscType.UHD_BLURAY: MediaType.VIDEO,
-                DiscType.DVD_VIDEO: MediaType.VIDEO,
-                DiscType.VCD2: MediaType.VIDEO,
-                DiscType.SVCD: MediaType.VIDEO,
-                DiscType.DVD_AUDIO: MediaType.MUSIC,
-                DiscType.SACD: MediaType.MUSIC,
-                DiscType.CDDA: MediaType.MUSIC,
-            }.get(self.device.disc_type, MediaType.VIDEO)
+            return DISC_TYPE_MEDIA_TYPES.get(self.snapshot.disc_type, MediaType.VIDEO)
         return None
 
     @property
     def media_duration(self):            
         """Duration of current playing media in seconds."""
-        if self.media_content_type == MediaType.MUSIC:
-            return self.playback_info.track_duration.total_seconds()
-        if self.media_content_type == MediaType.VIDEO:
-            return self.playback_info.total_duration.total_seconds()
+        media_type = self.media_content_type
+        if media_type == MediaType.MUSIC:
+            return self.snapshot.track_duration
+        if media_type == MediaType.VIDEO:
+            return self.snapshot.total_duration
         return None
 
     @property
     def media_position(self):
         """Position of current playing media in seconds."""
-        if self.media_content_type == MediaType.MUSIC:
-            return self.playback_info.track_elapsed_time.total_seconds()
-        if self.media_content_type == MediaType.VIDEO:
-            return self.playback_info.total_elapsed_time.total_seconds()
-        return None
+        return self._position
 
     @property
     def media_position_updated_at(self):
         """Last valid time of media position."""
-        if self.state in (STATE_PLAYING, STATE_PAUSED):
-            return dt_util.utcnow()
-        return None
+        return self._position_updated_at
 
     @property
     def media_title(self):
         """Title of current playing media."""
+        snapshot = self.snapshot
+        if not snapshot:
+            return None
         if self.media_content_type == MediaType.MUSIC:
-            track_name = self.playback_info.track_name
+            track_name = snapshot.track_name
             if (not track_name or track_name.endswith("*")) and self.musicbrainz_info and self.musicbrainz_info.track_titles:
-                mb_track_name = self.musicbrainz_info.track_titles.get(self.media_track, None)
+                mb_track_name = self.musicbrainz_info.track_titles.get(snapshot.track, None)
                 if mb_track_name:
                     return mb_track_name
             return track_name    
-        if self.device:
-            if self.playback_info.media_file_name:
-                return self.playback_info.media_file_name
-            else:
-                return {
-                    DiscType.BLURAY: "Blu-ray Disc",
-                    DiscType.UHD_BLURAY: "UHD Blu-ray Disc",
-                    DiscType.DVD_VIDEO: "DVD",
-                    DiscType.VCD2: "Video CD",
-                    DiscType.SVCD: "Super Video CD",
-                    DiscType.NONE: "No Disc"
-                }.get(self.device.disc_type, None)
-        return None
+        if snapshot.media_file_name:
+            return snapshot.media_file_name
+        return DISC_TYPE_TITLES.get(snapshot.disc_type, None)
 
     @property
     def media_artist(self):
         """Artist of current playing media, music track only."""
         if self.media_content_type == MediaType.MUSIC:
-            artist = self.playback_info.track_performer
+            artist = self.snapshot.track_performer
             if (not artist or artist.endswith("*")) and self.musicbrainz_info and self.musicbrainz_info.artist:
                 artist = self.musicbrainz_info.artist
             return artist
@@ -220,7 +422,7 @@ def media_artist(self):
     def media_album_name(self):
         """Album name of current playing media, music track only."""
         if self.media_content_type == MediaType.MUSIC:
-            album = self.playback_info.track_performer
+            album = self.snapshot.track_performer
             if (not album or album.endswith("*")) and self.musicbrainz_info and self.musicbrainz_info.title:
                 album = self.musicbrainz_info.title
             return album
@@ -229,222 +431,214 @@ def media_album_name(self):
     @property
     def media_album_artist(self):
         """Album artist of current playing media, music track only."""
-        if self.media_content_type == MediaType.MUSIC:
-            artist = self.playback_info.track_performer
-            if (not artist or artist.endswith("*")) and self.musicbrainz_info and self.musicbrainz_info.artist:
-                artist = self.musicbrainz_info.artist
-            return artist   
-        return None
+        return self.media_artist
 
     @property
     def media_track(self):
         """Track number of current playing media, music track only."""
         if self.media_content_type == MediaType.MUSIC:        
-            return self.playback_info.track        
+            return self.snapshot.track
         return None
 
     @property
     def media_image_hash(self) -> Optional[str]:
+        """The release id, once its artwork has been downloaded"""
         if self.media_content_type == MediaType.MUSIC:  
-            if self.musicbrainz_info:
-                return self.musicbrainz_info.release_id
+            return self._artwork_release_id
         return None
 
-    async def async_get_media_image(self):
-        if self.media_content_type == MediaType.MUSIC:
-            if self.musicbrainz_info and self.musicbrainz_info.image:
-                return self.musicbrainz_info.image, "image/jpeg"
+    @property
+    def media_image_url(self) -> Optional[str]:
+        """The local artwork url, served with strong ETags and long cache lifetimes."""
+        release_id = self.media_image_hash
+        if release_id:
+            return artwork_url(release_id)
         return None
 
+    @property
+    def media_image_remotely_accessible(self) -> bool:
+        """The artwork is served by Home Assistant itself, no need for the image proxy."""
+        return True
+
+    async def async_get_media_image(self):
+        release_id = self.media_image_hash
+        if release_id:
+            artwork = await get_artwork_cache(self.hass).async_get(release_id)
+            if artwork:
+                return artwork.content, artwork.content_type
+        return None, None
+
     @property
     def source(self):
         """Name of the current input source."""
-        if self.device and self.device.input_source:
-            return self.device.input_source.name.replace("_"," ").title()
+        if self.snapshot and self.snapshot.input_source:
+            return self.snapshot.input_source.name.replace("_"," ").title()
         return None
 
     @property
     def source_list(self):
         """List of available input sources."""
-        return [e.name.replace("_"," ").title() for e in SetInputSource]
+        return SOURCE_LIST
 
     @property
     def sound_mode(self):
         """Name of the current sound mode."""
-        if self.playback_info:
-            return self.playback_info.audio_type
+        if self.snapshot:
+            return self.snapshot.audio_type
         return None
 
     @property
     def repeat(self):
         """Return current repeat mode."""
-        if self.playback_info:
-            return {
-                OppoRepeatMode.REPEAT_ALL: RepeatMode.ALL,
-                OppoRepeatMode.REPEAT_TITLE: RepeatMode.ONE,
-                OppoRepeatMode.REPEAT_CHAPTER: RepeatMode.ONE,
-                OppoRepeatMode.REPEAT_ONE: RepeatMode.ONE,
-                OppoRepeatMode.SHUFFLE: RepeatMode.OFF,
-                OppoRepeatMode.RANDOM: RepeatMode.OFF,
-                OppoRepeatMode.OFF: RepeatMode.OFF
-            }.get(self.playback_info.repeat_mode, RepeatMode.OFF)
+        if self.snapshot:
+            return REPEAT_MODES.get(self.snapshot.repeat_mode, RepeatMode.OFF)
         return None
 
     @property
     def shuffle(self):
         """Boolean if shuffle is enabled."""
-        if self.playback_info:
-            return self.playback_info.repeat_mode in [OppoRepeatMode.SHUFFLE, OppoRepeatMode.RANDOM]
+        if self.snapshot:
+            return self.snapshot.repeat_mode in [OppoRepeatMode.SHUFFLE, OppoRepeatMode.RANDOM]
         return None
 
     @property
     def supported_features(self):
-        return (
-            MediaPlayerEntityFeature.PLAY
-            | MediaPlayerEntityFeature.PLAY_MEDIA
-            | MediaPlayerEntityFeature.PAUSE
-            | MediaPlayerEntityFeature.STOP
-            | MediaPlayerEntityFeature.VOLUME_SET
-            | MediaPlayerEntityFeature.VOLUME_MUTE
-            | MediaPlayerEntityFeature.BROWSE_MEDIA
-            | MediaPlayerEntityFeature.SEEK
-            | MediaPlayerEntityFeature.TURN_OFF
-            | MediaPlayerEntityFeature.TURN_ON
-            | MediaPlayerEntityFeature.REPEAT_SET
-            | MediaPlayerEntityFeature.SHUFFLE_SET
-            | MediaPlayerEntityFeature.NEXT_TRACK
-            | MediaPlayerEntityFeature.PREVIOUS_TRACK
-            | MediaPlayerEntityFeature.SELECT_SOURCE
-            | MediaPlayerEntityFeature.VOLUME_STEP
-        )
+        return SUPPORTED_FEATURES
 
     @property
     def extra_state_attributes(self):
         attrs = {}
-
-        if self.device:
-            attrs[ATTR_DEVICE_HDMI_MODE] = str(self.device.hdmi_mode)
-            attrs[ATTR_DEVICE_HDR_SETTING] = str(self.device.hdr_setting)
-            attrs[ATTR_DEVICE_ZOOM_MODE] = str(self.device.zoom_mode)
-            attrs[ATTR_DEVICE_DISC_TYPE] = str(self.device.disc_type)
-            attrs[ATTR_DEVICE_CDDB_ID] = self.device.cddb_id
-            attrs[ATTR_DEVICE_SUBTITLE_SHIFT] = self.device.subtitle_shift
-            attrs[ATTR_DEVICE_OSD_POSITION] = self.device.osd_position
-
-        if self.playback_info:
-            attrs[ATTR_PLAYBACK_TRACK_NAME] = self.playback_info.track_name
-            attrs[ATTR_PLAYBACK_TRACK_ALBUM] = self.playback_info.track_album
-            attrs[ATTR_PLAYBACK_TRACK_PERFORMER] = self.playback_info.track_performer
-            attrs[ATTR_PLAYBACK_TRACK] = self.playback_info.track
-            attrs[ATTR_PLAYBACK_TRACK_TOTAL] = self.playback_info.track_total
-            attrs[ATTR_PLAYBACK_CHAPTER] = self.playback_info.chapter
-            attrs[ATTR_PLAYBACK_CHAPTER_TOTAL] = self.playback_info.chapter_total
-            attrs[ATTR_PLAYBACK_TRACK_ELAPSED_TIME] = strfdelta(self.playback_info.track_elapsed_time, "%H:%M:%S")
-            attrs[ATTR_PLAYBACK_TRACK_REMAINING_TIME] = strfdelta(self.playback_info.track_remaining_time, "%H:%M:%S")
-            attrs[ATTR_PLAYBACK_TRACK_DURATION] = strfdelta(self.playback_info.track_duration, "%H:%M:%S")
-            attrs[ATTR_PLAYBACK_CHAPTER_ELAPSED_TIME] = strfdelta(self.playback_info.chapter_elapsed_time, "%H:%M:%S")
-            attrs[ATTR_PLAYBACK_CHAPTER_REMAINING_TIME] = strfdelta(self.playback_info.chapter_remaining_time, "%H:%M:%S")
-            attrs[ATTR_PLAYBACK_CHAPTER_DURATION] = strfdelta(self.playback_info.chapter_duration, "%H:%M:%S")
-            attrs[ATTR_PLAYBACK_TOTAL_ELAPSED_TIME] = strfdelta(self.playback_info.total_elapsed_time, "%H:%M:%S")
-            attrs[ATTR_PLAYBACK_TOTAL_REMAINING_TIME] = strfdelta(self.playback_info.total_remaining_time, "%H:%M:%S")
-            attrs[ATTR_PLAYBACK_TOTAL_DURATION] = strfdelta(self.playback_info.total_duration, "%H:%M:%S")
-            attrs[ATTR_PLAYBACK_AUDIO_TYPE] = self.playback_info.audio_type
-            attrs[ATTR_PLAYBACK_SUBTITLE_TYPE] = self.playback_info.subtitle_type
-            attrs[ATTR_PLAYBACK_ASPECT_RATIO] = self.playback_info.aspect_ratio
-            attrs[ATTR_PLAYBACK_REPEAT_MODE] = str(self.playback_info.repeat_mode)
-            attrs[ATTR_PLAYBACK_VIDEO_3D_STATUS] = str(self.playback_info.video_3d_status)
-            attrs[ATTR_PLAYBACK_VIDEO_HDR_STATUS] = str(self.playback_info.video_hdr_status)
-            attrs[ATTR_PLAYBACK_MEDIA_FILE_FORMAT] = self.playback_info.media_file_format
-            attrs[ATTR_PLAYBACK_MEDIA_FILE_NAME] = self.playback_info.media_file_name
+        snapshot = self.snapshot
+        fmt = self._format_duration
+        tier = self._attribute_tier
+
+        if not snapshot:
+            return attrs
+
+        if self.restored:
+            attrs[ATTR_RESTORED] = True
+        attrs[ATTR_DEVICE_HDMI_MODE] = str(snapshot.hdmi_mode)
+        attrs[ATTR_DEVICE_HDR_SETTING] = str(snapshot.hdr_setting)
+        attrs[ATTR_DEVICE_DISC_TYPE] = str(snapshot.disc_type)
+        attrs[ATTR_DEVICE_CDDB_ID] = snapshot.cddb_id
+        attrs[ATTR_PLAYBACK_REPEAT_MODE] = str(snapshot.repeat_mode)
+        attrs[ATTR_PLAYBACK_VIDEO_3D_STATUS] = str(snapshot.video_3d_status)
+        attrs[ATTR_PLAYBACK_VIDEO_HDR_STATUS] = str(snapshot.video_hdr_status)
+        attrs[ATTR_PLAYBACK_MEDIA_FILE_FORMAT] = snapshot.media_file_format
+        attrs[ATTR_PLAYBACK_MEDIA_FILE_NAME] = snapshot.media_file_name
+
+        if tier == ATTRIBUTE_TIER_ESSENTIAL:
+            return attrs
+
+        attrs[ATTR_DEVICE_ZOOM_MODE] = str(snapshot.zoom_mode)
+        attrs[ATTR_DEVICE_SUBTITLE_SHIFT] = snapshot.subtitle_shift
+        attrs[ATTR_DEVICE_OSD_POSITION] = snapshot.osd_position
+        attrs[ATTR_PLAYBACK_TRACK_NAME] = snapshot.track_name
+        attrs[ATTR_PLAYBACK_TRACK_ALBUM] = snapshot.track_album
+        attrs[ATTR_PLAYBACK_TRACK_PERFORMER] = snapshot.track_performer
+        attrs[ATTR_PLAYBACK_TRACK] = snapshot.track
+        attrs[ATTR_PLAYBACK_TRACK_TOTAL] = snapshot.track_total
+        attrs[ATTR_PLAYBACK_CHAPTER] = snapshot.chapter
+        attrs[ATTR_PLAYBACK_CHAPTER_TOTAL] = snapshot.chapter_total
+        attrs[ATTR_PLAYBACK_TRACK_ELAPSED_TIME] = fmt(snapshot.track_elapsed_time)
+        attrs[ATTR_PLAYBACK_TRACK_REMAINING_TIME] = fmt(snapshot.track_remaining_time)
+        attrs[ATTR_PLAYBACK_TRACK_DURATION] = fmt(snapshot.track_duration)
+        attrs[ATTR_PLAYBACK_CHAPTER_ELAPSED_TIME] = fmt(snapshot.chapter_elapsed_time)
+        attrs[ATTR_PLAYBACK_CHAPTER_REMAINING_TIME] = fmt(snapshot.chapter_remaining_time)
+        attrs[ATTR_PLAYBACK_CHAPTER_DURATION] = fmt(snapshot.chapter_duration)
+        attrs[ATTR_PLAYBACK_TOTAL_ELAPSED_TIME] = fmt(snapshot.total_elapsed_time)
+        attrs[ATTR_PLAYBACK_TOTAL_REMAINING_TIME] = fmt(snapshot.total_remaining_time)
+        attrs[ATTR_PLAYBACK_TOTAL_DURATION] = fmt(snapshot.total_duration)
+        attrs[ATTR_PLAYBACK_AUDIO_TYPE] = snapshot.audio_type
+        attrs[ATTR_PLAYBACK_SUBTITLE_TYPE] = snapshot.subtitle_type
+        attrs[ATTR_PLAYBACK_ASPECT_RATIO] = snapshot.aspect_ratio
+
+        if tier == ATTRIBUTE_TIER_DEBUG:
+            attrs[ATTR_POSITION] = self._position
+            attrs[ATTR_POSITION_UPDATED_AT] = self._position_updated_at
+            attrs[ATTR_VERBOSE_MODE] = str(self._manager.verbose_mode)
+            attrs[ATTR_WATCHED] = self._manager.watched
+            attrs[ATTR_POWER_ON_DURATION] = self._manager.power_on_duration
 
         return attrs
 
     async def async_turn_on(self):
         """Turn the media player on."""
-        await self.device.async_send_command(OppoRemoteCode.PON)
+        await self._manager.async_power_on()
 
     async def async_turn_off(self):
         """Turn the media player off."""
-        await self.device.async_send_command(OppoRemoteCode.POF)
+        await self._manager.async_send_command(OppoRemoteCommand(OppoRemoteCode.POF))
 
     async def async_mute_volume(self, mute):
         """Mute the volume."""
-        await self.device.async_send_command(OppoRemoteCode.MUT)      
+        await self._manager.async_send_command(OppoRemoteCommand(OppoRemoteCode.MUT))
 
     async def async_set_volume_level(self, volume):
         """Set volume level, range 0..1."""
-        await self.device.async_set_volume(int(volume * 100.0))
+        await self._manager.async_send_command(OppoSetVolumeLevelCommand(int(volume * 100.0)))
 
     async def async_select_source(self, source):
         """Select input source."""
-        await self.device.async_set_input_source(SetInputSource[source.replace(" ","_").upper()])
+        await self._manager.async_send_command(OppoSetInputSourceCommand(SetInputSource[source.replace(" ","_").upper()]))
 
     async def async_media_play(self):
         """Play media."""
-        if self.device:
-            await self.device.async_send_command(OppoRemoteCode.PLA)
+        await self._manager.async_send_command(OppoRemoteCommand(OppoRemoteCode.PLA))
 
     async def async_media_stop(self):
         """Stop the media player."""
-        if self.device:
-            await self.device.async_send_command(OppoRemoteCode.STP)
+        await self._manager.async_send_command(OppoRemoteCommand(OppoRemoteCode.STP))
 
     async def async_media_pause(self):
         """Pause the media player."""
-        if self.device:
-            await self.device.async_send_command(OppoRemoteCode.PAU)
+        await self._manager.async_send_command(OppoRemoteCommand(OppoRemoteCode.PAU))
             
     async def async_media_pop_up_menu(self):
         """send pop up menu command."""
-        if self.device:
-            await self.device.async_send_command(OppoRemoteCode.MNU)
+        await self._manager.async_send_command(OppoRemoteCommand(OppoRemoteCode.MNU))
 
     async def async_media_next_track(self):
         """Send next track command."""
-        if self.device:
-            await self.device.async_send_command(OppoRemoteCode.NXT)
+        await self._manager.async_send_command(OppoRemoteCommand(OppoRemoteCode.NXT))
 
     async def async_media_previous_track(self):
         """Send previous track command."""
-        if self.device:
-            await self.device.async_send_command(OppoRemoteCode.PRE)
+        await self._manager.async_send_command(OppoRemoteCommand(OppoRemoteCode.PRE))
 
     async def async_media_seek(self, position):
         """Send seek command."""
-        if self.device:
-            seek_type = SetSearchMode.CHAPTER if self.media_content_type == MediaType.MUSIC else SetSearchMode.TITLE
-            seek_position = timedelta(seconds=position)
-            await self.device.async_set_position(seek_type, seek_position)
+        seek_position = timedelta(seconds=position)
+        if self.media_content_type == MediaType.MUSIC:
+            await self._manager.async_send_command(OppoSetChapterPositionCommand(seek_position))
+        else:
+            await self._manager.async_send_command(OppoSetTitlePositionCommand(seek_position))
 
     async def async_volume_up(self):
         """Turn volume up for media player."""
-        if self.device:
-            await self.device.async_send_command(OppoRemoteCode.VUP)
+        await self._manager.async_send_command(OppoRemoteCommand(OppoRemoteCode.VUP))
 
     async def async_volume_down(self):
         """Turn volume down for media player."""
-        if self.device:
-            await self.device.async_send_command(OppoRemoteCode.VDN)
+        await self._manager.async_send_command(OppoRemoteCommand(OppoRemoteCode.VDN))
 
     async def async_set_repeat(self, repeat):
         """Set repeat mode."""
         one_mode = SetRepeatMode.TRACK
-        if self.device:
-            if self.media_content_type == MediaType.VIDEO:
-                one_mode = SetRepeatMode.CHAPTER
-            
-            if RepeatMode == Repeatmode.ONE:
-                await self.device.async_set_repeat_mode(one_mode)
-            elif RepeatMode == RepeatMode.ALL:
-                await self.device.async_set_repeat_mode(SetRepeatMode.ALL)
-            else:
-                await self.device.async_set_repeat_mode(SetRepeatMode.OFF)
+        if self.media_content_type == MediaType.VIDEO:
+            one_mode = SetRepeatMode.CHAPTER
+        
+        if repeat == RepeatMode.ONE:
+            await self._manager.async_send_command(OppoSetRepeatModeCommand(one_mode))
+        elif repeat == RepeatMode.ALL:
+            await self._manager.async_send_command(OppoSetRepeatModeCommand(SetRepeatMode.ALL))
+        else:
+            await self._manager.async_send_command(OppoSetRepeatModeCommand(SetRepeatMode.OFF))
 
     async def async_set_shuffle(self, shuffle):
         """Enable/disable shuffle mode."""
-        if self.device:
-            if self.media_content_type == MediaType.MUSIC:
-                if shuffle:
-                    await self.device.async_set_repeat_mode(SetRepeatMode.RANDOM)
-                else:
-                    await self.device.async_set_repeat_mode(SetRepeatMode.OFF)
+        if self.media_content_type == MediaType.MUSIC:
+            if shuffle:
+                await self._manager.async_send_command(OppoSetRepeatModeCommand(SetRepeatMode.RANDOM))
+            else:
+                await self._manager.async_send_command(OppoSetRepeatModeCommand(SetRepeatMode.OFF))
@@ -2,7 +2,8 @@
 
 import asyncio
 import logging
-from typing import Dict
+import time
+from typing import Dict, Optional, Tuple
 from dataclasses import dataclass
 import musicbrainzngs
 
@@ -19,17 +20,163 @@ class MusicBrainzInfo:
   artist: str = None
   title: str = None 
   track_titles: Dict[int,str] = None
-  image: str = None
+
+class MusicBrainzNotFound(Exception):
+  """The disc is not known to MusicBrainz"""
+
+class CircuitBreaker:
+  """
+  Stops calling MusicBrainz after repeated failures.  Once the reset timeout has passed,
+  a single probe is let through (half open), which closes the circuit if it succeeds.
+  A probe that never reports back (e.g. cancelled) lets another one through after the
+  reset timeout, so the circuit cannot get stuck half open.
+  """
+  CLOSED = "closed"
+  OPEN = "open"
+  HALF_OPEN = "half_open"
+
+  def __init__(self, failure_threshold: int = MUSICBRAINZ_FAILURE_THRESHOLD, reset_timeout: float = MUSICBRAINZ_RESET_TIMEOUT):
+    self._failure_threshold = failure_threshold
+    self._reset_timeout = reset_timeout
+    self._state = self.CLOSED
+    self._failures = 0
+    self._opened_at = None
+    self._probe_started_at = None
+
+  @property
+  def state(self) -> str:
+    return self._state
+
+  def allow(self) -> bool:
+    """Indicates whether a call may be made"""
+    now = time.monotonic()
+    if (
+      (self._state == self.OPEN and now - self._opened_at >= self._reset_timeout) or
+      (self._state == self.HALF_OPEN and now - self._probe_started_at >= self._reset_timeout)
+    ):
+      _LOGGER.debug("MusicBrainz circuit half open, probing")
+      self._state = self.HALF_OPEN
+      self._probe_started_at = now
+      return True
+    return self._state == self.CLOSED
+
+  def abandon(self) -> None:
+    """The call was cancelled without an outcome, a pending probe goes back to open."""
+    if self._state == self.HALF_OPEN:
+      self._state = self.OPEN
+
+  def record_success(self) -> None:
+    if self._state != self.CLOSED:
+      _LOGGER.info("MusicBrainz is reachable again")
+    self._state = self.CLOSED
+    self._failures = 0
+
+  def record_failure(self) -> None:
+    self._failures += 1
+    if self._state == self.HALF_OPEN or self._failures >= self._failure_threshold:
+      if self._state != self.OPEN:
+        _LOGGER.info(f"MusicBrainz lookups failing, pausing them for {self._reset_timeout} seconds")
+      self._state = self.OPEN
+      self._opened_at = time.monotonic()
+
+  def as_dict(self) -> dict:
+    return {
+      "state": self._state,
+      "failures": self._failures,
+      "opened_seconds_ago": round(time.monotonic() - self._opened_at) if self._opened_at else None
+    }
+
+class NegativeCache:
+  """Disc ids that recently could not be resolved, with separate TTLs per reason"""
+  NOT_FOUND = "not_found"
+  ERROR = "error"
+
+  def __init__(self, max_entries: int = MUSICBRAINZ_NEGATIVE_CACHE_SIZE):
+    self._max_entries = max_entries
+    self._entries = {}  # type: Dict[str, Tuple[float, str]]
+
+  def get(self, disc_id: str) -> Optional[str]:
+    """The reason the disc id is cached, if it is"""
+    entry = self._entries.get(disc_id)
+    if entry is None:
+      return None
+    if entry[0] <= time.monotonic():
+      del self._entries[disc_id]
+      return None
+    return entry[1]
+
+  def add(self, disc_id: str, reason: str) -> None:
+    now = time.monotonic()
+    ttl = MUSICBRAINZ_NOT_FOUND_TTL if reason == self.NOT_FOUND else MUSICBRAINZ_ERROR_TTL
+    if len(self._entries) >= self._max_entries:
+      self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+      while len(self._entries) >= self._max_entries:
+        del self._entries[next(iter(self._entries))]
+    self._entries[disc_id] = (now + ttl, reason)
+
+  def discard(self, disc_id: str) -> None:
+    self._entries.pop(disc_id, None)
+
+  def as_dict(self) -> dict:
+    now = time.monotonic()
+    return {k: {"reason": v[1], "expires_in": round(v[0] - now)} for k, v in self._entries.items() if v[0] > now}
+
+_breaker = CircuitBreaker()
+_negative_cache = NegativeCache()
+
+def musicbrainz_diagnostics() -> dict:
+  """Circuit breaker and negative cache state"""
+  return {
+    "circuit": _breaker.as_dict(),
+    "negative_cache": _negative_cache.as_dict()
+  }
 
 def musicbrainz_get_info(disc_id: str) -> MusicBrainzInfo:
+  """Look up a disc, raises MusicBrainzNotFound if it is unknown and other errors as is."""
   try:
     # the "labels" include enables the cat#s we display
     response = musicbrainzngs.get_releases_by_discid(disc_id, includes=["recordings","artists"])
-    return _parse_response(disc_id, response)
+  except musicbrainzngs.ResponseError as err:
+    if getattr(err.cause, "code", None) == 404:
+      raise MusicBrainzNotFound(disc_id) from err
+    raise
+  info = _parse_response(disc_id, response)
+  if info is None:
+    raise MusicBrainzNotFound(disc_id)
+  return info
+
+async def async_musicbrainz_get_info(disc_id: str) -> MusicBrainzInfo:
+  """
+  Look up a disc without ever waiting on an outage: recently failed disc ids and an 
+  open circuit resolve immediately to an empty result, so the device metadata is used.
+  """
+  reason = _negative_cache.get(disc_id)
+  if reason:
+    _LOGGER.debug(f"Skipping lookup of {disc_id}, recently failed ({reason})")
+    return MusicBrainzInfo(disc_id)
+  if not _breaker.allow():
+    _LOGGER.debug(f"Skipping lookup of {disc_id}, MusicBrainz circuit is {_breaker.state}")
+    return MusicBrainzInfo(disc_id)
+
+  try:
+    info = await asyncio.wait_for(_async_musicbrainz_get_info(disc_id), MUSICBRAINZ_TIMEOUT)
+  except asyncio.CancelledError:
+    _breaker.abandon()
+    raise
+  except MusicBrainzNotFound:
+    _LOGGER.info(f"Disc {disc_id} not found on MusicBrainz")
+    _breaker.record_success()
+    _negative_cache.add(disc_id, NegativeCache.NOT_FOUND)
+    return MusicBrainzInfo(disc_id)
   except Exception as err:
     _LOGGER.info(f"Could not get disc information, error={err}")
+    _breaker.record_failure()
+    _negative_cache.add(disc_id, NegativeCache.ERROR)
     return MusicBrainzInfo(disc_id)
 
+  _breaker.record_success()
+  return info
+
 def _parse_response(disc_id: str, response: dict) -> MusicBrainzInfo:
   if response.get('disc'):
     #just use the first release for this disc
@@ -62,21 +209,11 @@ def _info_from_release(disc_id: str, rel: dict) -> MusicBrainzInfo:
         for track in medium["track-list"]:
           tracks[int(track["position"])] = track["recording"]["title"]        
         _LOGGER.debug(f"Found {len(tracks)} tracks")
-        image = _get_image(mbid)
-        if image:
-          _LOGGER.debug(f"Found coverart image")
         found = True
         break
     if found:
       break 
 
-  return MusicBrainzInfo(disc_id, mbid, artist, title, tracks, image)
-
-def _get_image(release_id: str):    
-  try:
-    return musicbrainzngs.get_image_front(release_id, "500")
-  except Exception as err:
-    _LOGGER.info(f"Could not get image for disc, error={err}")  
-    return None
+  return MusicBrainzInfo(disc_id, mbid, artist, title, tracks)
 
-async_musicbrainz_get_info = async_wrap(musicbrainz_get_info)
+_async_musicbrainz_get_info = async_wrap(musicbrainz_get_info)
@@ -0,0 +1,197 @@
+"""On-demand profiling of the integration's callbacks."""
+
+import asyncio
+import logging
+import time
+import tracemalloc
+from functools import wraps
+from typing import Callable, Dict, Iterable, List
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from oppoudpsdk import OppoClient
+
+from .const import DOMAIN, DATA_PROFILER
+from .manager import OppoUdpManager
+
+_LOGGER = logging.getLogger(__name__)
+
+#entity hooks invoked from the dispatcher callbacks
+ENTITY_HOOKS = ("async_device_connected", "async_device_disconnected", "async_client_created")
+
+class CallProfiler:
+    """
+    Wall-clock times and traced allocations of the integration's callbacks over a time
+    window.  Everything is instrumented by swapping in wrappers when the profiler starts
+    and restoring the originals when it stops, so there is no overhead while inactive.
+    Allocations are the net traced memory change during a call, which is approximate
+    for coroutines since other tasks run while they wait.
+    """
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._stats = {}  # type: Dict[str, List[float]]
+        self._restore = []  # type: List[Callable[[], None]]
+        self._started_tracemalloc = False
+        self._started_at = None
+
+    @property
+    def active(self) -> bool:
+        return self._started_at is not None
+
+    def start(self, managers: Iterable[OppoUdpManager]) -> None:
+        """Instrument the entities, SDK event handlers and MusicBrainz lookups."""
+        from . import media_player
+        from .entity import OppoUdpEntity
+        from .media_player import OppoUdpMediaPlayer
+        from .remote import OppoUdpRemote
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+        for manager in managers:
+            if manager.client:
+                self._instrument_events(manager.client)
+
+        for klass in (OppoUdpEntity, OppoUdpMediaPlayer, OppoUdpRemote):
+            for attr in ENTITY_HOOKS:
+                if attr in vars(klass):
+                    self._patch(klass, attr, self._wrap(f"dispatcher:{klass.__name__}.{attr}", vars(klass)[attr]))
+
+        for klass in (OppoUdpEntity, OppoUdpMediaPlayer):
+            for attr, value in list(vars(klass).items()):
+                if isinstance(value, property) and value.fget:
+                    wrapped = self._wrap(f"property:{klass.__name__}.{attr}", value.fget)
+                    self._patch(klass, attr, property(wrapped, value.fset, value.fdel, value.__doc__))
+
+        self._patch(
+            media_player,
+            "async_musicbrainz_get_info",
+            self._wrap("musicbrainz:async_musicbrainz_get_info", media_player.async_musicbrainz_get_info)
+        )
+        self._started_at = time.monotonic()
+
+    def stop(self) -> float:
+        """Restore the originals, returns the length of the profiling window."""
+        while self._restore:
+            self._restore.pop()()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        duration = time.monotonic() - self._started_at if self._started_at is not None else 0.0
+        self._started_at = None
+        return duration
+
+    def report(self, duration: float) -> str:
+        """A report sorted by total time."""
+        lines = [
+            f"Oppo UDP-20x profile, {duration:.1f} seconds",
+            "",
+            f"{'callable':<72} {'calls':>8} {'total ms':>10} {'avg ms':>8} {'max ms':>8} {'alloc KiB':>10}",
+        ]
+        for name, (calls, total, maximum, alloc) in sorted(self._stats.items(), key=lambda i: i[1][1], reverse=True):
+            lines.append(
+                f"{name:<72} {int(calls):>8} {total * 1000:>10.2f} {total * 1000 / calls:>8.3f} "
+                f"{maximum * 1000:>8.3f} {alloc / 1024:>10.1f}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def _instrument_events(self, client: OppoClient) -> None:
+        """
+        Time the SDK event handlers by dispatching the client's events through a patched
+        async_event.  The handler lists are left alone, so handlers can still be added and
+        removed by identity (the manager does so for every confirmed command).
+        """
+        add = self._add
+        perf_counter = time.perf_counter
+        traced = tracemalloc.get_traced_memory
+
+        async def _timed(name: str, coro):
+            start, mem = perf_counter(), traced()[0]
+            try:
+                return await coro
+            finally:
+                add(name, perf_counter() - start, traced()[0] - mem)
+
+        async def async_event(event: str, *args, **kwargs):
+            for cb in client.event_handlers[event]:
+                name = f"sdk:{event}:{getattr(cb, '__qualname__', repr(cb))}"
+                asyncio.ensure_future(_timed(name, cb(*args, **kwargs)), loop=client.loop)
+
+        self._patch(client, "async_event", async_event)
+
+    def _patch(self, owner, attr: str, value) -> None:
+        if attr in vars(owner):
+            original = vars(owner)[attr]
+            self._restore.append(lambda: setattr(owner, attr, original))
+        else:
+            self._restore.append(lambda: delattr(owner, attr))
+        setattr(owner, attr, value)
+
+    def _add(self, name: str, elapsed: float, allocated: int) -> None:
+        stats = self._stats.get(name)
+        if stats is None:
+            self._stats[name] = [1, elapsed, elapsed, max(allocated, 0)]
+            return
+        stats[0] += 1
+        stats[1] += elapsed
+        if elapsed > stats[2]:
+            stats[2] = elapsed
+        stats[3] += max(allocated, 0)
+
+    def _wrap(self, name: str, func: Callable) -> Callable:
+        add = self._add
+        perf_counter = time.perf_counter
+        traced = tracemalloc.get_traced_memory
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start, mem = perf_counter(), traced()[0]
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    add(name, perf_counter() - start, traced()[0] - mem)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start, mem = perf_counter(), traced()[0]
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add(name, perf_counter() - start, traced()[0] - mem)
+        return wrapper
+
+@callback
+def async_start_profile(hass: HomeAssistant, duration: float) -> None:
+    """
+    Profile the integration in the background.  The profiler is reserved right away,
+    so a second request fails instead of its background task.
+    """
+    if hass.data.get(DATA_PROFILER):
+        raise HomeAssistantError("A profile is already running")
+    profiler = hass.data[DATA_PROFILER] = CallProfiler(hass)
+    hass.async_create_task(async_profile(hass, profiler, duration))
+
+async def async_profile(hass: HomeAssistant, profiler: CallProfiler, duration: float) -> str:
+    """Profile the integration for a number of seconds and write the report to the config dir."""
+    managers = [m for m in hass.data.get(DOMAIN, {}).values() if isinstance(m, OppoUdpManager)]
+    try:
+        profiler.start(managers)
+        await asyncio.sleep(duration)
+    finally:
+        elapsed = profiler.stop()
+        hass.data.pop(DATA_PROFILER)
+
+    path = hass.config.path(f"{DOMAIN}_profile_{time.strftime('%Y%m%d_%H%M%S')}.txt")
+    report = profiler.report(elapsed)
+
+    def _write():
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(report)
+
+    await hass.async_add_executor_job(_write)
+    _LOGGER.info(f"Wrote profile report to {path}")
+    return path
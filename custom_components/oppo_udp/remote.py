@@ -13,10 +13,10 @@
 from homeassistant.core import callback
 
 from oppoudpsdk import EVENT_DEVICE_STATE_UPDATED
-from oppoudpsdk import PowerStatus, OppoRemoteCode, OppoClient, OppoDevice
+from oppoudpsdk import PowerStatus, OppoRemoteCode, OppoRemoteCommand, OppoClient, OppoDevice
 
 from .entity import OppoUdpEntity
-from .const import DOMAIN
+from .const import DOMAIN, ATTR_RESTORED
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,22 +31,36 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 class OppoUdpRemote(OppoUdpEntity, RemoteEntity):
     """Device that sends commands to an Oppo UDP."""
 
+    def __init__(self, host, name, identifier, manager, **kwargs):
+        """Initialize the Oppo UDP remote."""
+        super().__init__(host, name, identifier, manager, **kwargs)
+        self._last_published = None
+
     @callback
     def async_client_created(self, client: OppoClient):
         """Handle when a new client is created (due to reconnections)."""
         client.add_event_handler(EVENT_DEVICE_STATE_UPDATED, self._on_device_state_updated)
 
     async def _on_device_state_updated(self, device: OppoDevice):
-        """Handle a device state update event"""        
-        self.schedule_update_ha_state()    
+        """Handle a device state update event, only the power state is published"""        
+        published = (self.is_on, self.restored)
+        if published != self._last_published:
+            self._last_published = published
+            self.schedule_update_ha_state()    
 
     @property
     def is_on(self):
         """Return true if device is on."""
-        if self.device:
-            return self.device.power_status == PowerStatus.ON
+        if self.snapshot:
+            return self.snapshot.power_status == PowerStatus.ON
         return False
 
+    @property
+    def extra_state_attributes(self):
+        if self.restored:
+            return {ATTR_RESTORED: True}
+        return None
+
     @property
     def should_poll(self):
         """No polling needed for Oppo UDP."""
@@ -54,30 +68,18 @@ def should_poll(self):
 
     async def async_turn_on(self, **kwargs):
         """Turn the device on."""
-        if not self.device:
-            _LOGGER.error("Unable to send commands, not connected to %s", self._host)
-            return
-
-        await self.device.async_send_command(OppoRemoteCode.PON)
+        await self._manager.async_power_on()
 
     async def async_turn_off(self, **kwargs):
         """Turn the device off."""
-        if not self.device:
-            _LOGGER.error("Unable to send commands, not connected to %s", self._host)
-            return
-
-        await self.device.async_send_command(OppoRemoteCode.POF)
+        await self._manager.async_send_command(OppoRemoteCommand(OppoRemoteCode.POF))
 
     async def async_send_command(self, command, **kwargs):
         """Send a command to one device."""
         num_repeats = kwargs[ATTR_NUM_REPEATS]
         delay = kwargs.get(ATTR_DELAY_SECS, DEFAULT_DELAY_SECS)
 
-        if not self.device:
-            _LOGGER.error("Unable to send commands, not connected to %s", self._host)
-            return
-
         for _ in range(num_repeats):
             for single_command in command:
-                await self.device.async_send_command(single_command)
+                await self._manager.async_send_command(OppoRemoteCommand(single_command), delay=delay)
                 await asyncio.sleep(delay)
@@ -0,0 +1,168 @@
+"""Immutable snapshot of the published Oppo UDP-20x device state."""
+
+import enum
+from operator import attrgetter
+from typing import NamedTuple, Optional
+
+from oppoudpsdk import OppoDevice
+from oppoudpsdk import DiscType, InputSource, PlayStatus, PowerStatus, RepeatMode
+from oppoudpsdk import HdmiMode, HdrSetting, ZoomMode, Video3dStatus, VideoHdrStatus
+
+#snapshot fields that tick along with the time code updates
+TIME_FIELDS = (
+    "track_elapsed_time",
+    "track_remaining_time",
+    "chapter_elapsed_time",
+    "chapter_remaining_time",
+    "total_elapsed_time",
+    "total_remaining_time",
+)
+
+_get_time_codes = attrgetter(*TIME_FIELDS)
+
+#snapshot fields holding SDK enums, stored by value
+ENUM_FIELDS = {
+    "power_status": PowerStatus,
+    "playback_status": PlayStatus,
+    "input_source": InputSource,
+    "disc_type": DiscType,
+    "hdmi_mode": HdmiMode,
+    "hdr_setting": HdrSetting,
+    "zoom_mode": ZoomMode,
+    "repeat_mode": RepeatMode,
+    "video_3d_status": Video3dStatus,
+    "video_hdr_status": VideoHdrStatus,
+}
+
+_NOT_PLAYING = frozenset([
+    PlayStatus.UNKNOWN,
+    PlayStatus.OFF,
+    PlayStatus.HOME_MENU,
+    PlayStatus.MEDIA_CENTER,
+    PlayStatus.SCREEN_SAVER,
+    PlayStatus.SETUP
+])
+
+class OppoStateSnapshot(NamedTuple):
+    """
+    Device and playback state captured in a single pass per SDK event.  Times are
+    stored as whole seconds.
+    """
+    power_status: PowerStatus
+    playback_status: PlayStatus
+    firmware_version: str
+    volume: int
+    is_muted: bool
+    input_source: InputSource
+    disc_type: DiscType
+    cddb_id: str
+    hdmi_mode: object
+    hdr_setting: object
+    zoom_mode: object
+    subtitle_shift: int
+    osd_position: int
+    track: int
+    track_total: int
+    chapter: int
+    chapter_total: int
+    track_elapsed_time: int
+    track_remaining_time: int
+    track_duration: int
+    chapter_elapsed_time: int
+    chapter_remaining_time: int
+    chapter_duration: int
+    total_elapsed_time: int
+    total_remaining_time: int
+    total_duration: int
+    audio_type: str
+    subtitle_type: str
+    aspect_ratio: str
+    repeat_mode: RepeatMode
+    video_3d_status: object
+    video_hdr_status: object
+    media_file_format: str
+    media_file_name: str
+    track_name: str
+    track_album: str
+    track_performer: str
+
+    @classmethod
+    def from_device(cls, device: Optional[OppoDevice]) -> Optional["OppoStateSnapshot"]:
+        """Capture the current state of the device"""
+        if device is None:
+            return None
+        pa = device.playback_attributes
+        return cls(
+            device.power_status,
+            device.playback_status,
+            device.firmware_version,
+            device.volume,
+            device.is_muted,
+            device.input_source,
+            device.disc_type,
+            device.cddb_id,
+            device.hdmi_mode,
+            device.hdr_setting,
+            device.zoom_mode,
+            device.subtitle_shift,
+            device.osd_position,
+            pa.track,
+            pa.track_total,
+            pa.chapter,
+            pa.chapter_total,
+            int(pa.track_elapsed_time.total_seconds()),
+            int(pa.track_remaining_time.total_seconds()),
+            int(pa.track_duration.total_seconds()),
+            int(pa.chapter_elapsed_time.total_seconds()),
+            int(pa.chapter_remaining_time.total_seconds()),
+            int(pa.chapter_duration.total_seconds()),
+            int(pa.total_elapsed_time.total_seconds()),
+            int(pa.total_remaining_time.total_seconds()),
+            int(pa.total_duration.total_seconds()),
+            pa.audio_type,
+            pa.subtitle_type,
+            pa.aspect_ratio,
+            pa.repeat_mode,
+            pa.video_3d_status,
+            pa.video_hdr_status,
+            pa.media_file_format,
+            pa.media_file_name,
+            pa.track_name,
+            pa.track_album,
+            pa.track_performer,
+        )
+
+    @property
+    def is_playing(self) -> bool:
+        """Indicates whether the device is playing"""
+        return self.playback_status not in _NOT_PLAYING
+
+    def state_key(self) -> "OppoStateSnapshot":
+        """The snapshot without the ticking time codes, used for change detection"""
+        return self._replace(**dict.fromkeys(TIME_FIELDS, 0))
+
+    def time_codes(self) -> tuple:
+        """The ticking time codes, used to tell whether the device refreshed them"""
+        return _get_time_codes(self)
+
+    def as_dict(self) -> dict:
+        """A JSON friendly representation, used for diagnostics"""
+        return {
+            k: v if v is None or isinstance(v, (bool, int, float, str)) else str(v)
+            for k, v in self._asdict().items()
+        }
+
+    def as_stored_dict(self) -> dict:
+        """A JSON friendly representation that can be restored, used for restore state"""
+        return {k: v.value if isinstance(v, enum.Enum) else v for k, v in self._asdict().items()}
+
+    @classmethod
+    def from_stored_dict(cls, data: dict) -> Optional["OppoStateSnapshot"]:
+        """Restore a snapshot, None if it was stored by an incompatible version"""
+        try:
+            return cls(**{
+                field: ENUM_FIELDS[field](data[field]) if field in ENUM_FIELDS and data[field] is not None else data[field]
+                for field in cls._fields
+            })
+        except (KeyError, ValueError, TypeError):
+            return None
@@ -0,0 +1,166 @@
+"""
+Micro-benchmark of the media player's extra_state_attributes per state write.
+
+Compares the attributes as they were built before the snapshot and duration formatter
+(every field read through the device property chain, the nine times formatted with
+strfdelta and a string.Template each) with OppoUdpMediaPlayer.extra_state_attributes,
+with the times published as HH:MM:SS strings and as raw seconds.  The playback position
+advances by a second on every write, as it does with the per-second time codes.
+
+Needs the integration requirements (homeassistant and oppoudpsdk):
+
+    python scripts/bench_attributes.py
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import os
+import sys
+import timeit
+import types
+from datetime import timedelta
+from itertools import cycle
+from string import Template
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from oppoudpsdk.const import *
+
+from custom_components.oppo_udp.const import CONF_DURATION_FORMAT, DURATION_FORMAT_SECONDS, DURATION_FORMAT_STRING
+from custom_components.oppo_udp.media_player import OppoUdpMediaPlayer
+from custom_components.oppo_udp.snapshot import OppoStateSnapshot
+
+from bench_snapshot import ChainEntity, ChainManager, bench, create_device
+
+#seconds of playback the writes cycle through
+TICKS = 600
+
+class DeltaTemplate(Template):
+    delimiter = "%"
+
+def strfdelta(tdelta, fmt):
+    d = {"D": tdelta.days}
+    hours, rem = divmod(tdelta.seconds, 3600)
+    minutes, seconds = divmod(rem, 60)
+    d["H"] = '{:02d}'.format(hours)
+    d["M"] = '{:02d}'.format(minutes)
+    d["S"] = '{:02d}'.format(seconds)
+    t = DeltaTemplate(fmt)
+    return t.substitute(**d)
+
+class BaselineMediaPlayer(ChainEntity):
+    """extra_state_attributes as it was before the snapshot and duration formatter"""
+    @property
+    def extra_state_attributes(self):
+        attrs = {}
+
+        if self.device:
+            attrs[ATTR_DEVICE_HDMI_MODE] = str(self.device.hdmi_mode)
+            attrs[ATTR_DEVICE_HDR_SETTING] = str(self.device.hdr_setting)
+            attrs[ATTR_DEVICE_ZOOM_MODE] = str(self.device.zoom_mode)
+            attrs[ATTR_DEVICE_DISC_TYPE] = str(self.device.disc_type)
+            attrs[ATTR_DEVICE_CDDB_ID] = self.device.cddb_id
+            attrs[ATTR_DEVICE_SUBTITLE_SHIFT] = self.device.subtitle_shift
+            attrs[ATTR_DEVICE_OSD_POSITION] = self.device.osd_position
+
+        if self.playback_info:
+            attrs[ATTR_PLAYBACK_TRACK_NAME] = self.playback_info.track_name
+            attrs[ATTR_PLAYBACK_TRACK_ALBUM] = self.playback_info.track_album
+            attrs[ATTR_PLAYBACK_TRACK_PERFORMER] = self.playback_info.track_performer
+            attrs[ATTR_PLAYBACK_TRACK] = self.playback_info.track
+            attrs[ATTR_PLAYBACK_TRACK_TOTAL] = self.playback_info.track_total
+            attrs[ATTR_PLAYBACK_CHAPTER] = self.playback_info.chapter
+            attrs[ATTR_PLAYBACK_CHAPTER_TOTAL] = self.playback_info.chapter_total
+            attrs[ATTR_PLAYBACK_TRACK_ELAPSED_TIME] = strfdelta(self.playback_info.track_elapsed_time, "%H:%M:%S")
+            attrs[ATTR_PLAYBACK_TRACK_REMAINING_TIME] = strfdelta(self.playback_info.track_remaining_time, "%H:%M:%S")
+            attrs[ATTR_PLAYBACK_TRACK_DURATION] = strfdelta(self.playback_info.track_duration, "%H:%M:%S")
+            attrs[ATTR_PLAYBACK_CHAPTER_ELAPSED_TIME] = strfdelta(self.playback_info.chapter_elapsed_time, "%H:%M:%S")
+            attrs[ATTR_PLAYBACK_CHAPTER_REMAINING_TIME] = strfdelta(self.playback_info.chapter_remaining_time, "%H:%M:%S")
+            attrs[ATTR_PLAYBACK_CHAPTER_DURATION] = strfdelta(self.playback_info.chapter_duration, "%H:%M:%S")
+            attrs[ATTR_PLAYBACK_TOTAL_ELAPSED_TIME] = strfdelta(self.playback_info.total_elapsed_time, "%H:%M:%S")
+            attrs[ATTR_PLAYBACK_TOTAL_REMAINING_TIME] = strfdelta(self.playback_info.total_remaining_time, "%H:%M:%S")
+            attrs[ATTR_PLAYBACK_TOTAL_DURATION] = strfdelta(self.playback_info.total_duration, "%H:%M:%S")
+            attrs[ATTR_PLAYBACK_AUDIO_TYPE] = self.playback_info.audio_type
+            attrs[ATTR_PLAYBACK_SUBTITLE_TYPE] = self.playback_info.subtitle_type
+            attrs[ATTR_PLAYBACK_ASPECT_RATIO] = self.playback_info.aspect_ratio
+            attrs[ATTR_PLAYBACK_REPEAT_MODE] = str(self.playback_info.repeat_mode)
+            attrs[ATTR_PLAYBACK_VIDEO_3D_STATUS] = str(self.playback_info.video_3d_status)
+            attrs[ATTR_PLAYBACK_VIDEO_HDR_STATUS] = str(self.playback_info.video_hdr_status)
+            attrs[ATTR_PLAYBACK_MEDIA_FILE_FORMAT] = self.playback_info.media_file_format
+            attrs[ATTR_PLAYBACK_MEDIA_FILE_NAME] = self.playback_info.media_file_name
+
+        return attrs
+
+def playback_ticks(playback) -> list:
+    """The playback attributes for consecutive seconds of playback"""
+    second = timedelta(seconds=1)
+    return [
+        dataclasses.replace(
+            playback,
+            track_elapsed_time=playback.track_elapsed_time + i * second,
+            track_remaining_time=playback.track_remaining_time - i * second,
+            chapter_elapsed_time=playback.chapter_elapsed_time + i * second,
+            chapter_remaining_time=playback.chapter_remaining_time - i * second,
+            total_elapsed_time=playback.total_elapsed_time + i * second,
+            total_remaining_time=playback.total_remaining_time - i * second,
+        )
+        for i in range(TICKS)
+    ]
+
+def bench_baseline(device, ticks: list, number: int, repeat: int) -> float:
+    entity = BaselineMediaPlayer(ChainManager(types.SimpleNamespace(device=device)))
+    states = cycle(ticks)
+
+    def write():
+        device.playback_attributes = next(states)
+        entity.extra_state_attributes
+
+    return bench("strfdelta over the property chain", write, number, repeat)
+
+def bench_snapshot(device, ticks: list, duration_format: str, number: int, repeat: int) -> float:
+    playback = device.playback_attributes
+    snapshots = []
+    for tick in ticks:
+        device.playback_attributes = tick
+        snapshots.append(OppoStateSnapshot.from_device(device))
+    device.playback_attributes = playback
+
+    #the parts of the manager the media player reads
+    manager = types.SimpleNamespace(
+        config_entry=types.SimpleNamespace(options={CONF_DURATION_FORMAT: duration_format}),
+        snapshot=None,
+        snapshot_restored=False,
+    )
+    entity = OppoUdpMediaPlayer("127.0.0.1", "oppo_udp", "bench", manager)
+    states = cycle(snapshots)
+
+    def write():
+        manager.snapshot = next(states)
+        entity.extra_state_attributes
+
+    return bench(f"snapshot, {duration_format} durations", write, number, repeat)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--number", type=int, default=20000, help="writes per timing")
+    parser.add_argument("--repeat", type=int, default=5, help="timings, the best one is reported")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    try:
+        device = create_device(loop).device
+        #let the disc id event go out
+        loop.run_until_complete(asyncio.sleep(0))
+        ticks = playback_ticks(device.playback_attributes)
+        baseline = bench_baseline(device, ticks, args.number, args.repeat)
+        for duration_format in (DURATION_FORMAT_STRING, DURATION_FORMAT_SECONDS):
+            best = bench_snapshot(device, ticks, duration_format, args.number, args.repeat)
+            print(f"{'speedup':<40} {baseline / best:>8.2f} x")
+    finally:
+        loop.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
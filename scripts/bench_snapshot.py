@@ -0,0 +1,124 @@
+"""
+Benchmark of reading the published player state.
+
+Compares reading every published field through the property chain the entities used
+before the snapshot (entity.device -> manager.device -> client.device, and
+device.playback_attributes for the playback fields, with the times converted from
+timedelta on every read) against capturing an OppoStateSnapshot once with from_device
+and reading the fields from it.  Both sides read each field once, as a state write does.
+
+Needs the integration requirements (homeassistant and oppoudpsdk):
+
+    python scripts/bench_snapshot.py
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import timeit
+from datetime import timedelta
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from oppoudpsdk import OppoClient, DiscType, PlayStatus, PowerStatus
+
+from custom_components.oppo_udp.snapshot import OppoStateSnapshot
+
+#fields read from the device itself, the others come from its playback attributes
+DEVICE_FIELDS = OppoStateSnapshot._fields[:OppoStateSnapshot._fields.index("track")]
+PLAYBACK_FIELDS = OppoStateSnapshot._fields[len(DEVICE_FIELDS):]
+
+def create_device(loop: asyncio.AbstractEventLoop):
+    """A client whose device is playing a UHD Blu-ray an hour in"""
+    client = OppoClient("127.0.0.1", 23, event_loop=loop)
+    device = client.device
+    device.power_status = PowerStatus.ON
+    device.playback_status = PlayStatus.PLAY
+    device.firmware_version = "UDP20X-71-0424"
+    device.volume = 35
+    device.disc_type = DiscType.UHD_BLURAY
+    device.cddb_id_1, device.cddb_id_2 = "A1B2C3D4", "E5F6A7B8"
+    pa = device.playback_attributes
+    pa.track, pa.track_total, pa.chapter, pa.chapter_total = 1, 1, 12, 32
+    pa.track_elapsed_time = pa.total_elapsed_time = timedelta(seconds=3723)
+    pa.track_remaining_time = pa.total_remaining_time = timedelta(seconds=4101)
+    pa.track_duration = pa.total_duration = timedelta(seconds=7824)
+    pa.chapter_elapsed_time = timedelta(seconds=141)
+    pa.chapter_remaining_time = timedelta(seconds=208)
+    pa.chapter_duration = timedelta(seconds=349)
+    pa.audio_type, pa.subtitle_type, pa.aspect_ratio = "Dolby TrueHD 7.1", "English", "2.39"
+    pa.media_file_name = "Movie"
+    return client
+
+class ChainManager:
+    """The manager as the entities saw it before the snapshot"""
+    def __init__(self, client: OppoClient):
+        self._client = client
+
+    @property
+    def device(self):
+        if self._client:
+            return self._client.device
+        return None
+
+class ChainEntity:
+    """The entity property chain before the snapshot"""
+    def __init__(self, manager: ChainManager):
+        self._manager = manager
+
+    @property
+    def device(self):
+        return self._manager.device
+
+    @property
+    def playback_info(self):
+        if not self.device:
+            return None
+        return self.device.playback_attributes
+
+def read_chain(entity: ChainEntity) -> None:
+    """Read every published field through the property chain"""
+    for field in DEVICE_FIELDS:
+        if entity.device:
+            getattr(entity.device, field)
+    for field in PLAYBACK_FIELDS:
+        if entity.playback_info:
+            value = getattr(entity.playback_info, field)
+            if isinstance(value, timedelta):
+                value.total_seconds()
+
+def read_snapshot(client: OppoClient) -> None:
+    """Capture a snapshot once, then read every field from it"""
+    snapshot = OppoStateSnapshot.from_device(client.device)
+    for field in OppoStateSnapshot._fields:
+        getattr(snapshot, field)
+
+def bench(name: str, func, number: int, repeat: int) -> float:
+    """Best time per call in microseconds"""
+    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+    print(f"{name:<40} {best:>8.2f} us per write")
+    return best
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--number", type=int, default=20000, help="writes per timing")
+    parser.add_argument("--repeat", type=int, default=5, help="timings, the best one is reported")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    try:
+        client = create_device(loop)
+        #let the disc id event go out
+        loop.run_until_complete(asyncio.sleep(0))
+        entity = ChainEntity(ChainManager(client))
+        chain = bench("property chain", lambda: read_chain(entity), args.number, args.repeat)
+        snapshot = bench("from_device + snapshot reads", lambda: read_snapshot(client), args.number, args.repeat)
+        print(f"{'speedup':<40} {chain / snapshot:>8.2f} x")
+    finally:
+        loop.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
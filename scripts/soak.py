@@ -0,0 +1,468 @@
+"""
+Soak test for the Oppo UDP-20x integration.
+
+Boots Home Assistant in a temporary config dir with the integration pointed at an
+in-process stand-in player that speaks the IP control protocol, then simulates days
+of playback, disc swaps, dropped connections, outages and config entry reloads
+while driving the media player, remote and broadcast service.  The event loop skips
+ahead to the next timer whenever it would otherwise sit idle, so a simulated day
+takes seconds.
+
+The handlers, timers and tasks of the manager (_resource_counts), the integration
+and SDK tasks (_task_counts), the loop timers, the dispatcher and bus listeners and
+the RSS are sampled throughout.  The first day is warm up; the run fails (exit code 1)
+if any count on the last day exceeds the second day or the RSS grew more than the
+tolerance.
+
+Needs homeassistant and the integration requirements, psutil is optional:
+
+    python scripts/soak.py --days 5
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import socket
+import string
+import sys
+import tempfile
+from collections import defaultdict
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import musicbrainzngs
+
+from homeassistant import config as conf_util, loader
+from homeassistant.bootstrap import async_load_base_functionality
+from homeassistant.components.websocket_api.const import DATA_CONNECTIONS, SIGNAL_WEBSOCKET_CONNECTED, SIGNAL_WEBSOCKET_DISCONNECTED
+from homeassistant.config_entries import SOURCE_USER, ConfigEntries, ConfigEntry
+from homeassistant.const import CONF_HOST, CONF_PORT
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import DATA_DISPATCHER, async_dispatcher_send
+from homeassistant.setup import async_setup_component
+
+from custom_components.oppo_udp import diagnostics
+from custom_components.oppo_udp.const import DOMAIN, CONF_ADAPTIVE_VERBOSE, SERVICE_BROADCAST_COMMAND
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_LOGGER = logging.getLogger("soak")
+
+HOUR = 3600
+SAMPLE_INTERVAL = 900
+TRACK_LENGTH = 240
+TRACK_COUNT = 12
+OUTAGE_DURATION = 600
+
+CORE_CONFIG = {"name": "Soak", "latitude": 0, "longitude": 0, "elevation": 0, "unit_system": "metric", "time_zone": "UTC"}
+
+#play status as queried (QPL) and as pushed (UPL)
+QUERY_STATUS = {"PLAY": "PLAY", "PAUS": "PAUSE", "STOP": "STOP", "OPEN": "OPEN", "OFF": "OFF"}
+
+class WarpedEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop that jumps to the next timer when there is nothing to do: no ready
+    callbacks, no pending I/O and no executor jobs in flight.
+    """
+    def __init__(self):
+        super().__init__()
+        self.warp = False
+        self._offset = 0.0
+        self._executor_jobs = 0
+
+    def time(self) -> float:
+        return super().time() + self._offset
+
+    def run_in_executor(self, executor, func, *args):
+        future = super().run_in_executor(executor, func, *args)
+        self._executor_jobs += 1
+        future.add_done_callback(self._on_executor_job_done)
+        return future
+
+    def _on_executor_job_done(self, _) -> None:
+        self._executor_jobs -= 1
+
+    def _run_once(self) -> None:
+        if self.warp and not self._ready and not self._executor_jobs:
+            #loopback I/O is readable as soon as it is written, no need to wait for it
+            self._process_events(self._selector.select(0))
+            timers = [handle.when() for handle in self._scheduled if not handle.cancelled()]
+            if not self._ready and timers:
+                self._offset += max(0.0, min(timers) - self.time())
+        super()._run_once()
+
+    def timer_count(self) -> int:
+        return sum(1 for handle in self._scheduled if not handle.cancelled())
+
+class OppoStandIn:
+    """A player speaking just enough of the IP control protocol for the integration and SDK"""
+    def __init__(self):
+        self.port = None
+        self.power = True
+        self.verbose = "0"
+        self.status = "STOP"
+        self.volume = 30
+        self.track = 1
+        self.elapsed = 0
+        self.disc_id = self._new_disc_id()
+        self.received = 0
+        self._server = None
+        self._writers = set()
+        self._ticker = None
+
+    @staticmethod
+    def _new_disc_id() -> str:
+        return "".join(random.choices(string.ascii_letters + string.digits, k=27)) + "-"
+
+    async def async_start(self) -> None:
+        self._server = await asyncio.start_server(self._async_handle, "127.0.0.1", self.port or 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def async_stop(self) -> None:
+        """Go away completely, connection attempts are refused until started again."""
+        self._server.close()
+        self.drop_connections()
+        await self._server.wait_closed()
+
+    def drop_connections(self) -> None:
+        for writer in list(self._writers):
+            writer.close()
+
+    def press(self, code: str) -> None:
+        """Act as if a button was pressed on the physical remote."""
+        self._answer(code, [])
+
+    def swap_disc(self) -> None:
+        """Eject, load a different disc and start playing it."""
+        self._set_status("OPEN")
+        self.disc_id = self._new_disc_id()
+        self.track, self.elapsed = 1, 0
+        for update in ("@UPL CLOS", "@UDT CDDA", "@UPL LOAD"):
+            self._push(update)
+        self._set_status("PLAY")
+
+    async def _async_handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while True:
+                line = (await reader.readuntil(b"\r")).decode().strip()
+                self.received += 1
+                code, *params = line.lstrip("#").split(" ")
+                for reply_code, value in self._answer(code, params):
+                    if self.verbose == "0" and reply_code == code:
+                        writer.write(f"@OK {value}".rstrip().encode() + b"\r")
+                    else:
+                        writer.write(f"@{reply_code} OK {value}".rstrip().encode() + b"\r")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def _answer(self, code: str, params: list) -> list:
+        """Apply a command, returns the (code, value) replies"""
+        if code in ("PON", "POF", "POW"):
+            self._set_power(code == "PON" or (code == "POW" and not self.power))
+            return [(code, "ON" if self.power else "OFF")]
+        if code == "QPW":
+            return [(code, "ON" if self.power else "OFF")]
+        if code == "SVM":
+            self.verbose = params[0]
+        if code in ("SVM", "QVM"):
+            return [(code, self.verbose)]
+        if code in ("PLA", "PAU", "STP"):
+            self._set_status({"PLA": "PLAY", "PAU": "PAUS", "STP": "STOP"}[code])
+            return [(code, QUERY_STATUS[self.status])]
+        if code in ("NXT", "PRE"):
+            self.track = max(1, min(TRACK_COUNT, self.track + (1 if code == "NXT" else -1)))
+            self.elapsed = 0
+            return [(code, "")]
+        if code in ("VUP", "VDN", "SVL", "QVL"):
+            if code == "SVL":
+                self.volume = int(params[0])
+            elif code != "QVL":
+                self.volume = max(0, min(100, self.volume + (1 if code == "VUP" else -1)))
+            return [(code, str(self.volume))]
+        if code == "QCD":
+            return [("QC1", self.disc_id[:14]), ("QC2", self.disc_id[14:])]
+        remaining = max(0, TRACK_LENGTH - self.elapsed)
+        values = {
+            "QPL": QUERY_STATUS[self.status],
+            "QVR": "UDP20X-56-0624",
+            "QHD": "AUTO",
+            "QDT": "CDDA",
+            "QSH": "0",
+            "QOP": "0",
+            "QZM": "00",
+            "QHR": "Auto",
+            "QIS": "0",
+            "QAR": "16WW",
+            "QTK": f"{self.track:02d}/{TRACK_COUNT:02d}",
+            "QCH": "01/01",
+            "QTE": _hms(self.elapsed),
+            "QTR": _hms(remaining),
+            "QCE": _hms(self.elapsed),
+            "QCR": _hms(remaining),
+            "QEL": _hms((self.track - 1) * TRACK_LENGTH + self.elapsed),
+            "QRE": _hms((TRACK_COUNT - self.track) * TRACK_LENGTH + remaining),
+            "QAT": "LPCM",
+            "QST": "OFF",
+            "QRP": "00",
+            "QFT": "CDDA",
+            "QFN": "disc",
+            "QTN": f"Track{self.track}",
+            "QTA": "Album",
+            "QTP": "Artist",
+            "QDS": "0",
+        }
+        return [(code, values.get(code, " ".join(params)))]
+
+    def _set_power(self, power: bool) -> None:
+        if power != self.power:
+            self.power = power
+            self._push(f"@UPW {int(power)}")
+            self._set_status("STOP" if power else "OFF")
+
+    def _set_status(self, status: str) -> None:
+        if status != self.status:
+            self.status = status
+            if status != "OFF":
+                self._push(f"@UPL {status}")
+        if status == "PLAY" and self._ticker is None:
+            self._ticker = asyncio.get_running_loop().call_later(1, self._tick)
+        elif status != "PLAY" and self._ticker:
+            self._ticker.cancel()
+            self._ticker = None
+
+    def _tick(self) -> None:
+        """A second of playback, with time codes in verbose mode"""
+        self.elapsed += 1
+        if self.elapsed >= TRACK_LENGTH:
+            self.track, self.elapsed = self.track % TRACK_COUNT + 1, 0
+        if self.verbose == "3":
+            self._push(f"@UTC {self.track:03d} 001 T {_hms(self.elapsed)}")
+        self._ticker = asyncio.get_running_loop().call_later(1, self._tick)
+
+    def _push(self, message: str) -> None:
+        """Send an update, the player only does so in verbose modes 2 and 3"""
+        if self.verbose in ("2", "3"):
+            for writer in self._writers:
+                writer.write(message.encode() + b"\r")
+
+def _hms(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _rss_mib() -> float:
+    """Resident set size, from psutil if available, otherwise from /proc"""
+    if psutil:
+        return psutil.Process().memory_info().rss / 2**20
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+class Soak:
+    """Drives the integration through simulated days and keeps the samples"""
+    def __init__(self, hass, loop: WarpedEventLoop, player: OppoStandIn, entry_id: str):
+        self.hass = hass
+        self.loop = loop
+        self.player = player
+        self.entry_id = entry_id
+        self.samples = defaultdict(list)  # day -> [sample]
+        self.connected = defaultdict(int)  # day -> samples taken with a live session
+        self.broadcasts = defaultdict(int)
+        self._day = 0
+
+    @property
+    def manager(self):
+        return self.hass.data[DOMAIN][self.entry_id]
+
+    async def async_sleep(self, seconds: float) -> None:
+        """Let simulated time pass, sampling along the way."""
+        end = self.loop.time() + seconds
+        while self.loop.time() < end:
+            await asyncio.sleep(min(SAMPLE_INTERVAL, end - self.loop.time()))
+            self.sample()
+
+    def sample(self) -> None:
+        manager = self.manager
+        resources = manager._resource_counts()
+        self.connected[self._day] += bool(manager.client and manager.client.available)
+        dispatcher = self.hass.data.get(DATA_DISPATCHER, {})
+        self.samples[self._day].append({
+            "rss_mib": _rss_mib(),
+            "tasks": len(asyncio.all_tasks()),
+            "oppo_tasks": sum(diagnostics._task_counts().values()),
+            "manager_tasks": resources["tasks"],
+            "manager_timers": resources["timers"],
+            "event_handlers": sum(resources["event_handlers"].values()),
+            "loop_timers": self.loop.timer_count(),
+            "dispatcher_handlers": sum(len(targets) for targets in dispatcher.values()),
+            "bus_listeners": sum(self.hass.bus.async_listeners().values()),
+        })
+
+    async def async_call(self, domain: str, service: str, entity_id: str, **data) -> None:
+        await self.hass.services.async_call(domain, service, {"entity_id": entity_id, **data}, blocking=True)
+
+    def set_watched(self, watched: bool) -> None:
+        """Open or close a frontend, as the websocket API would report it."""
+        self.hass.data[DATA_CONNECTIONS] = int(watched)
+        async_dispatcher_send(self.hass, SIGNAL_WEBSOCKET_CONNECTED if watched else SIGNAL_WEBSOCKET_DISCONNECTED)
+
+    async def async_broadcast(self, commands: list) -> None:
+        response = await self.hass.services.async_call(
+            DOMAIN, SERVICE_BROADCAST_COMMAND, {"command": commands}, blocking=True, return_response=True
+        )
+        for result in response["results"].values():
+            self.broadcasts["answered" if result["success"] else result["error"]] += 1
+
+    async def async_run_day(self, day: int) -> None:
+        """A day in the life of the player"""
+        self._day = day
+        registry = er.async_get(self.hass)
+        entities = {e.domain: e.entity_id for e in er.async_entries_for_config_entry(registry, self.entry_id)}
+        media_player, remote = entities["media_player"], entities["remote"]
+
+        #overnight: standby, with a reload of the config entry
+        await self.async_sleep(3 * HOUR)
+        await self.hass.config_entries.async_reload(self.entry_id)
+        await self.async_sleep(15 * HOUR)
+
+        #evening: watched playback of a new disc with a few button presses
+        self.set_watched(True)
+        await self.async_call("media_player", "turn_on", media_player)
+        await self.async_sleep(60)
+        self.player.swap_disc()
+        await self.async_sleep(20 * 60)
+        await self.async_call("media_player", "volume_set", media_player, volume_level=0.4)
+        await self.async_call("media_player", "media_pause", media_player)
+        await self.async_sleep(5 * 60)
+        await self.async_call("media_player", "media_play", media_player)
+        await self.async_call("remote", "send_command", remote, command=["NXT"])
+        await self.async_broadcast(["VUP", "VDN"])
+        await self.async_sleep(30 * 60)
+
+        #the connection drops and the SDK reconnects by itself
+        self.player.drop_connections()
+        await self.async_sleep(15 * 60)
+
+        #the player goes away for a while, the manager has to reconnect with backoff
+        await self.player.async_stop()
+        await self.async_sleep(OUTAGE_DURATION)
+        await self.player.async_start()
+        await self.async_sleep(HOUR)
+
+        #unwatched playback of another disc, then off for the night
+        self.set_watched(False)
+        self.player.swap_disc()
+        await self.async_sleep(HOUR)
+        self.player.press("STP")
+        await self.async_call("remote", "turn_off", remote)
+        await self.async_sleep(24 * HOUR - (self.loop.time() - self._day_started_at))
+
+    async def async_run(self, days: int) -> None:
+        for day in range(days):
+            self._day_started_at = self.loop.time()
+            await self.async_run_day(day)
+            _LOGGER.warning(f"Day {day + 1}: {self.samples[day][-1]}")
+
+    def report(self, rss_tolerance: float) -> list:
+        """Print the daily maxima, returns the metrics that grew"""
+        days = sorted(self.samples)
+        metrics = list(self.samples[days[0]][0])
+        maxima = {day: {m: max(s[m] for s in self.samples[day]) for m in metrics} for day in days}
+        print("day  " + "  ".join(f"{m:>19}" for m in metrics) + "  connected")
+        for day in days:
+            uptime = self.connected[day] / len(self.samples[day])
+            print(f"{day + 1:>3}  " + "  ".join(f"{maxima[day][m]:>19.1f}" for m in metrics) + f"  {uptime:>9.0%}")
+        print(f"broadcast results: {dict(self.broadcasts)}, commands received by the player: {self.player.received}")
+
+        baseline, last = maxima[days[1]], maxima[days[-1]]
+        grown = [m for m in metrics if m != "rss_mib" and last[m] > baseline[m]]
+        if last["rss_mib"] - baseline["rss_mib"] > rss_tolerance:
+            grown.append("rss_mib")
+        return grown
+
+async def async_main(args, loop: WarpedEventLoop) -> int:
+    config_dir = tempfile.mkdtemp(prefix="oppo_udp_soak_")
+    try:
+        os.symlink(os.path.join(REPO, "custom_components"), os.path.join(config_dir, "custom_components"))
+
+        #MusicBrainz is unreachable, so disc swaps exercise the circuit breaker and negative cache
+        musicbrainzngs.set_hostname(f"127.0.0.1:{_free_port()}")
+
+        player = OppoStandIn()
+        await player.async_start()
+
+        #only the core, the registries and the dependencies of the integration, no frontend
+        hass = HomeAssistant(config_dir)
+        hass.config.skip_pip = True
+        loader.async_setup(hass)
+        hass.config_entries = ConfigEntries(hass, {})
+        await async_load_base_functionality(hass)
+        await async_setup_component(hass, "homeassistant", {})
+        await conf_util.async_process_ha_core_config(hass, CORE_CONFIG)
+        await async_setup_component(hass, "http", {"http": {"server_host": "127.0.0.1", "server_port": _free_port()}})
+        await hass.async_start()
+        entry = ConfigEntry(
+            version=1,
+            minor_version=1,
+            domain=DOMAIN,
+            title="soak",
+            data={CONF_HOST: "127.0.0.1", CONF_PORT: player.port},
+            source=SOURCE_USER,
+            options={CONF_ADAPTIVE_VERBOSE: True},
+        )
+        await hass.config_entries.async_add(entry)
+        await hass.async_block_till_done()
+
+        soak = Soak(hass, loop, player, entry.entry_id)
+        loop.warp = True
+        try:
+            await soak.async_run(args.days)
+        finally:
+            loop.warp = False
+            await hass.async_stop()
+            await player.async_stop()
+
+        grown = soak.report(args.rss_tolerance)
+        if grown:
+            print(f"FAIL: unbounded growth in {', '.join(grown)}")
+            return 1
+        print("OK: no growth")
+        return 0
+    finally:
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--days", type=int, default=5, help="simulated days, at least 3 (the first one is warm up)")
+    parser.add_argument("--rss-tolerance", type=float, default=16, help="MiB the RSS may grow between the second and the last day")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.days < 3:
+        parser.error("--days must be at least 3")
+    random.seed(args.seed)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    loop = WarpedEventLoop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(async_main(args, loop))
+    finally:
+        loop.close()
+
+if __name__ == "__main__":
+    sys.exit(main())